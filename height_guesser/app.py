@@ -1,21 +1,42 @@
-import os
-import uuid
-import tempfile
-from flask import Flask, request, render_template, jsonify, redirect, url_for
-from werkzeug.utils import secure_filename
-import soundfile as sf
-import numpy as np
 import io
+import os
+import time
+
+_import_start = time.perf_counter()
+
+# Sets NUMBA_CACHE_DIR, so it must come before anything importing librosa
+import startup
+
+from flask import (Flask, Request, Response, request, render_template, jsonify, url_for, g,
+                   send_file, stream_with_context)
 
-from feature_extractor import extract_features
+import metrics
+import profiling
+from audio_io import DecodeError, decode_audio, apply_profile, analysis_rate
+from batch import BatchRunner, BATCH_MAX_ITEMS, BATCH_MAX_BYTES
+import extraction_service
+from feature_extractor import HOP_LENGTH, extract_features_from_audio, features_to_vector
+from feature_cache import FeatureCache
+from jobs import JobQueue, QueueFull
+from live import LIVE_ANALYSIS_NOTE, LiveSessions, SessionLimit, RecordingTooLong
+from vad import trim_silence
 from height_predictor import HeightPredictor
 
+class InMemoryRequest(Request):
+    """Request keeping uploaded files in memory (bounded by the size limits)"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 
-# For Vercel deployment, use /tmp directory which is writable in serverless environments
+# Uploads are decoded in memory; this folder is only used for codecs that
+# need a temporary file (webm, m4a). For Vercel deployment, use /tmp
+# directory which is writable in serverless environments
 UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join('/tmp', 'height_guesser_uploads'))
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+MAX_UPLOAD_BYTES = 16 * 1024 * 1024  # 16MB max upload size (BATCH_MAX_BYTES for /predict/batch)
+app.config['MAX_CONTENT_LENGTH'] = max(MAX_UPLOAD_BYTES, BATCH_MAX_BYTES)
 
 # Create upload folder if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -23,6 +44,14 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # Initialize our height predictor
 height_predictor = HeightPredictor()
 
+# Features of recently seen recordings (FEATURE_CACHE_SIZE entries in memory,
+# plus a FEATURE_CACHE_DIR shared by all workers if set)
+feature_cache = FeatureCache()
+
+# Micro-batching extraction service shared by all workers (EXTRACTION_SERVICE
+# is a socket path or 'inprocess'); None extracts in this process
+extraction = extraction_service.connect(predictor=height_predictor, cache=feature_cache)
+
 # Allowed audio file extensions
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'ogg', 'flac', 'm4a', 'webm'}
 
@@ -34,84 +63,390 @@ def allowed_file(filename):
 def index():
     return render_template('index.html')
 
-@app.route('/predict', methods=['POST'])
-def predict_height():
+def validate_upload():
+    """
+    The uploaded audio file of the current request
+
+    Returns the file and None, or None and an error response if the upload
+    is missing or not an allowed type.
+    """
     # Check if the request has a file
     if 'audio' not in request.files:
-        return jsonify({'error': 'No audio file provided'}), 400
+        return None, (jsonify({'error': 'No audio file provided'}), 400)
     
     file = request.files['audio']
     
     # If no file was selected
     if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
+        return None, (jsonify({'error': 'No file selected'}), 400)
     
     # Check if file is allowed
     if not allowed_file(file.filename):
-        return jsonify({'error': f'File type not allowed. Please upload one of: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
+        return None, (jsonify({'error': f'File type not allowed. Please upload one of: {", ".join(ALLOWED_EXTENSIONS)}'}), 400)
+    
+    return file, None
+
+def run_prediction(data, extension, gender=None, use_cache=True):
+    """
+    Decode an upload, extract features and predict height
+    
+    Returns the JSON-serializable result served by /predict. With
+    ``use_cache`` False the features are always extracted (used when
+    profiling, so the profile covers the extraction).
+    """
+    # Decode straight from the request stream (in-process with PyAV for
+    # browser codecs; disk fallback only without it)
+    with metrics.stage('decode'):
+        y, sr = decode_audio(data, extension, tmp_dir=app.config['UPLOAD_FOLDER'], sr=analysis_rate())
+    metrics.observe('audio_duration_seconds', len(y) / sr)
+    
+    # Bound the analysed sample rate and duration
+    with metrics.stage('profile'):
+        y, sr, analysis = apply_profile(y, sr)
+    
+    # Analyse only the speech, not the silence around it
+    with metrics.stage('vad'):
+        y, speech = trim_silence(y, sr)
+    analysis.update(speech)
+    metrics.observe('analysed_fraction', speech['analysed_fraction'])
+    
+    if extraction is not None and use_cache:
+        # Batched with concurrent requests by the extraction service
+        with metrics.stage('service'):
+            features, prediction = extraction.predict(y, sr, gender)
+    else:
+        # Extract only the features the predictor needs
+        extract = feature_cache.extract if use_cache else extract_features_from_audio
+        with metrics.stage('extract'), profiling.allocations('extract'):
+            features = extract(y, sr, keys=height_predictor.required_features)
+        
+        # Get prediction, range, confidence and imperial conversions in one pass
+        with metrics.stage('predict'):
+            prediction = height_predictor.predict_batch([features_to_vector(features)], [gender])
+    return format_prediction(prediction, analysis)
+
+def format_prediction(prediction, analysis):
+    """/predict response for a length-1 ``HeightPredictor.predict_batch`` result"""
+    imperial = prediction['imperial']
+    
+    # Format imperial strings
+    imperial_height = f"{imperial['feet'][0]}'{imperial['inches'][0]}\""
+    imperial_range = (f"{imperial['lower_feet'][0]}'{imperial['lower_inches'][0]}\" - "
+                      f"{imperial['upper_feet'][0]}'{imperial['upper_inches'][0]}\"")
+    
+    # Prepare result
+    return {
+        'height': float(prediction['height'][0]),
+        'lower_bound': float(prediction['lower_bound'][0]),
+        'upper_bound': float(prediction['upper_bound'][0]),
+        'confidence': float(prediction['confidence'][0]),
+        'unit': 'cm',
+        'imperial': {
+            'height': imperial_height,
+            'total_inches': float(imperial['total_inches'][0]),
+            'range': imperial_range
+        },
+        'analysis': analysis
+    }
+
+# Background jobs for /predict/async (JOB_WORKERS threads, at most
+# JOB_QUEUE_SIZE waiting, results kept for JOB_TTL seconds)
+job_queue = JobQueue(run_prediction)
+
+@app.route('/predict', methods=['POST'])
+def predict_height():
+    file, error = validate_upload()
+    if error:
+        return error
     
     # Get gender if provided
     gender = request.form.get('gender')
     
-    # Save file with a secure name to avoid file path manipulation
-    filename = str(uuid.uuid4()) + os.path.splitext(secure_filename(file.filename))[1]
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
+    # Admins can profile a single request (see profiling.py)
+    token = request.headers.get('X-Profile-Token')
+    if token is not None and not profiling.authorized(token):
+        return jsonify({'error': 'Profiling not allowed'}), 403
     
     try:
-        # Extract features
-        features = extract_features(filepath)
-        
-        # Get prediction
-        height, lower_bound, upper_bound = height_predictor.predict_with_range(features, gender)
-        
-        # Get confidence
-        _, confidence = height_predictor.predict(features, gender)
-        
-        # Convert to imperial measurements
-        feet, inches, total_inches = height_predictor.cm_to_imperial(height)
-        lower_feet, lower_inches, lower_total_inches = height_predictor.cm_to_imperial(lower_bound)
-        upper_feet, upper_inches, upper_total_inches = height_predictor.cm_to_imperial(upper_bound)
-        
-        # Format imperial strings
-        imperial_height = f"{feet}'{inches}\""
-        imperial_range = f"{lower_feet}'{lower_inches}\" - {upper_feet}'{upper_inches}\""
-        
-        # Prepare result
-        result = {
-            'height': height,
-            'lower_bound': lower_bound,
-            'upper_bound': upper_bound,
-            'confidence': confidence,
-            'unit': 'cm',
-            'imperial': {
-                'height': imperial_height,
-                'total_inches': total_inches,
-                'range': imperial_range
-            }
-        }
-        
-        # Clean up the temporary file
-        try:
-            os.remove(filepath)
-        except:
-            # Ignore errors removing temp files in serverless environments
-            pass
+        extension = file.filename.rsplit('.', 1)[1].lower()
+        if token is None:
+            return jsonify(run_prediction(file.read(), extension, gender))
         
+        with profiling.RequestProfile() as profile:
+            result = run_prediction(file.read(), extension, gender, use_cache=False)
+        result['profile'] = profile.summary()
+        result['profile']['files'] = {kind: url_for('get_profile', profile_id=profile.id, kind=kind)
+                                      for kind in profiling.PROFILE_FILES}
         return jsonify(result)
     
+    except profiling.ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 429
+    
+    except extraction_service.ServiceBusy as e:
+        return jsonify({'error': str(e)}), 503
+    
+    except DecodeError as e:
+        return jsonify({'error': str(e)}), 400
+    
     except Exception as e:
-        # Clean up the temporary file if it exists
-        try:
-            if os.path.exists(filepath):
-                os.remove(filepath)
-        except:
-            # Ignore errors removing temp files in serverless environments
-            pass
-        
         # Return error
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict/async', methods=['POST'])
+def predict_height_async():
+    file, error = validate_upload()
+    if error:
+        return error
+    
+    extension = file.filename.rsplit('.', 1)[1].lower()
+    try:
+        job_id = job_queue.submit(file.read(), extension, request.form.get('gender'))
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'url': url_for('get_job', job_id=job_id)
+    }), 202
+
+# Clips of /predict/batch requests (BATCH_WORKERS threads shared by all
+# batches, at most BATCH_WORKERS clips of one batch in flight)
+batch_runner = BatchRunner(run_prediction)
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    files = [file for file in request.files.getlist('audio') if file.filename != '']
+    if not files:
+        return jsonify({'error': 'No audio files provided'}), 400
+    if len(files) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Too many files: at most {BATCH_MAX_ITEMS} per batch'}), 413
+    
+    # One gender for every clip, or one per clip in upload order
+    genders = request.form.getlist('gender')
+    if len(genders) <= 1:
+        genders = (genders or [None]) * len(files)
+    elif len(genders) != len(files):
+        return jsonify({'error': 'Provide one gender for all files or one per file'}), 400
+    
+    items = []
+    for index, (file, gender) in enumerate(zip(files, genders)):
+        item = {'index': index, 'filename': file.filename}
+        if allowed_file(file.filename):
+            item.update(data=file.read(), extension=file.filename.rsplit('.', 1)[1].lower(),
+                        gender=gender or None)
+        else:
+            item.update(extension='other',
+                        error=f'File type not allowed. Please upload one of: {", ".join(ALLOWED_EXTENSIONS)}')
+        items.append(item)
+    
+    # One JSON line per clip as soon as it is done
+    return Response(stream_with_context(batch_runner.stream(items)), mimetype='application/x-ndjson')
+
+# Recordings streamed while the user is still speaking (at most
+# LIVE_MAX_SESSIONS open, LIVE_MAX_SECONDS of audio each, dropped after
+# LIVE_TTL idle seconds)
+live_sessions = LiveSessions()
+
+def live_result(session, features):
+    """Prediction from a live session's features, with how much audio it covers"""
+    with metrics.stage('predict'):
+        prediction = height_predictor.predict_batch([features_to_vector(features)], [session.gender])
+    # Same keys as /predict's analysis where they apply; 'vad' is False and
+    # the note says why the result can differ from uploading the recording
+    analysis = {
+        'name': 'live',
+        'sample_rate': session.sr,
+        'duration': round(session.seconds, 3),
+        'analysed_duration': round(session.extractor.n_frames * HOP_LENGTH / session.sr, 3),
+        'vad': False,
+        'note': LIVE_ANALYSIS_NOTE,
+    }
+    result = format_prediction(prediction, analysis)
+    result.update(session_id=session.id, final=session.extractor.finished)
+    return result
+
+@app.route('/live', methods=['POST'])
+def live_start():
+    try:
+        sr = int(request.form.get('sample_rate', ''))
+    except ValueError:
+        return jsonify({'error': 'sample_rate must be an integer number of Hz'}), 400
+    try:
+        session = live_sessions.create(sr, request.form.get('gender') or None)
+    except SessionLimit as e:
+        return jsonify({'error': str(e)}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'session_id': session.id,
+        'sample_rate': session.sr,
+        'url': url_for('live_chunk', session_id=session.id),
+        'finish_url': url_for('live_finish', session_id=session.id)
+    }), 201
+
+@app.route('/live/<session_id>', methods=['POST'])
+def live_chunk(session_id):
+    # Body: the next samples as 16-bit little-endian mono PCM
+    session = live_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired live session'}), 404
+    
+    try:
+        with session.lock:
+            if session.extractor.finished:
+                return jsonify({'error': 'Unknown or expired live session'}), 404
+            frames = session.extractor.n_frames
+            with metrics.stage('extract'):
+                live_sessions.update(session, request.get_data())
+                updated = session.extractor.n_frames > frames
+                features = session.extractor.features() if updated else None
+            if not updated:
+                # No new complete window: nothing new to predict from
+                return jsonify({'session_id': session.id, 'final': False,
+                                'duration': round(session.seconds, 3), 'updated': False})
+            result = live_result(session, features)
+    except RecordingTooLong as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    result['updated'] = True
+    return jsonify(result)
+
+@app.route('/live/<session_id>/finish', methods=['POST'])
+def live_finish(session_id):
+    # Body: optional last samples; only the frames not yet analysed remain,
+    # so the final result is ready right after recording stops
+    session = live_sessions.finish(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired live session'}), 404
+    
+    try:
+        with session.lock:
+            with metrics.stage('extract'):
+                live_sessions.update(session, request.get_data())
+                features = session.extractor.finish()
+            result = live_result(session, features)
+    except RecordingTooLong as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify(result)
+
+@app.route('/live', methods=['GET'])
+def live_stats():
+    return jsonify(live_sessions.stats())
+
+@app.route('/profiles/<profile_id>.<kind>', methods=['GET'])
+def get_profile(profile_id, kind):
+    if not profiling.authorized(request.headers.get('X-Profile-Token')):
+        return jsonify({'error': 'Profiling not allowed'}), 403
+    if kind not in profiling.PROFILE_FILES or not all(c in '0123456789abcdef' for c in profile_id):
+        return jsonify({'error': 'Unknown profile'}), 404
+    path = os.path.join(profiling.PROFILE_DIR, f'{profile_id}.{kind}')
+    if not os.path.exists(path):
+        return jsonify({'error': 'Unknown profile'}), 404
+    return send_file(path, as_attachment=True)
+
+@app.route('/extraction', methods=['GET'])
+def extraction_stats():
+    if extraction is None:
+        return jsonify({'error': 'No extraction service configured'}), 404
+    stats = extraction.stats()
+    stats.pop('metrics', None)
+    return jsonify(stats)
+
+@app.route('/extraction/metrics', methods=['GET'])
+def extraction_metrics():
+    # Metrics of a separate service process (an in-process batcher reports
+    # through /metrics)
+    stats = extraction.stats() if extraction is not None else {}
+    if 'metrics' not in stats:
+        return jsonify({'error': 'No extraction service process configured'}), 404
+    return stats['metrics'], 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    # Optional long polling: ?wait=<seconds>, capped at 30 seconds
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), 30)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    
+    job = job_queue.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job)
+
+@app.route('/jobs', methods=['GET'])
+def job_stats():
+    return jsonify(job_queue.stats())
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+    metrics.start_request()
+
+@app.before_request
+def limit_upload_size():
+    # MAX_CONTENT_LENGTH admits batch-sized bodies; other uploads stay smaller
+    limit = BATCH_MAX_BYTES if request.endpoint == 'predict_batch' else MAX_UPLOAD_BYTES
+    if request.content_length is not None and request.content_length > limit:
+        return jsonify({'error': f'Upload too large: at most {limit} bytes'}), 413
+
+@app.after_request
+def record_first_request(response):
+    # Time of the first prediction served by this process (cold start cost)
+    if request.endpoint in ('predict_height', 'predict_height_async') and 'request_start' in g:
+        startup.record('first_request_seconds', time.perf_counter() - g.request_start)
+    return response
+
+@app.after_request
+def record_metrics(response):
+    if not metrics.METRICS_ENABLED or request.endpoint not in ('predict_height', 'predict_height_async',
+                                                               'live_chunk', 'live_finish'):
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    if request.endpoint in ('live_chunk', 'live_finish'):
+        # Live chunks are raw PCM, not uploaded files
+        extension = 'pcm'
+    else:
+        file = request.files.get('audio')
+        extension = file.filename.rsplit('.', 1)[-1].lower() if file and '.' in file.filename else 'none'
+        if extension not in ALLOWED_EXTENSIONS:
+            extension = 'other'
+    metrics.observe('request_seconds', elapsed, endpoint=request.endpoint)
+    metrics.increment('requests_total', endpoint=request.endpoint, extension=extension,
+                      status=response.status_code)
+    # Per-stage breakdown for the browser's devtools / the caller
+    timings = dict(metrics.request_timings(), total=elapsed)
+    response.headers['Server-Timing'] = metrics.server_timing(timings)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not metrics.METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    body = metrics.registry.render() + metrics.render_cache(feature_cache.stats())
+    return body, 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.route('/startup', methods=['GET'])
+def startup_timings():
+    return jsonify(startup.STARTUP_TIMINGS)
+
+# Heavy libraries (librosa, numba, scipy) are imported on first use; with
+# WARMUP set they are loaded and compiled here, before serving
+startup.record('import_seconds', time.perf_counter() - _import_start)
+if startup.WARMUP:
+    startup.warm_up()
+
 if __name__ == '__main__':
     app.run(debug=True)
 
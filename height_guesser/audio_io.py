@@ -0,0 +1,230 @@
+import io
+import os
+import tempfile
+import numpy as np
+
+from metrics import stage
+
+# Analysis profiles bound the work done per upload: 'sr' is the rate the
+# signal is resampled to (None keeps the native rate), 'max_duration' caps
+# the analysed seconds (None for no cap) and 'segments' is the number of
+# evenly spaced excerpts that make up the capped duration. See
+# benchmarks/analysis_profile.py for the accuracy/latency trade-off.
+ANALYSIS_PROFILES = {
+    'full': {'sr': None, 'max_duration': None, 'segments': 1},
+    'speech': {'sr': 16000, 'max_duration': 30.0, 'segments': 1},
+    'fast': {'sr': 16000, 'max_duration': 10.0, 'segments': 5},
+}
+ANALYSIS_PROFILE = os.environ.get('ANALYSIS_PROFILE', 'full')
+
+try:
+    import soundfile as sf
+    # Containers libsndfile can decode straight from a memory buffer
+    # (MP3 needs libsndfile >= 1.1)
+    IN_MEMORY_FORMATS = {fmt.lower() for fmt in sf.available_formats()} & {'wav', 'flac', 'ogg', 'mp3'}
+except (ImportError, OSError):
+    sf = None
+    IN_MEMORY_FORMATS = set()
+
+try:
+    # PyAV links FFmpeg's libraries, so browser codecs (webm/opus, m4a/aac,
+    # mp3) decode in-process instead of through an ffmpeg subprocess
+    import av
+except ImportError:
+    av = None
+
+class DecodeError(ValueError):
+    """Raised when no decoder can read an upload"""
+
+def decode_error(extension, name=None):
+    """
+    DecodeError for audio no decoder could read
+
+    Decoders often raise with no message (e.g. a bare EOFError), so the
+    message names the file and the likely causes instead.
+    """
+    extension = extension.lower().lstrip('.') or 'audio'
+    name = name or f"the uploaded {extension} file"
+    return DecodeError(f"Could not decode {name}: it is empty, corrupt or not {extension} audio")
+
+def decode_in_memory(data):
+    """
+    Decode an audio file held in memory with soundfile
+
+    Returns a mono float32 signal and its sample rate, as ``librosa.load``
+    with ``sr=None`` would.
+    """
+    y, sr = sf.read(io.BytesIO(data), dtype='float32')
+    if y.ndim > 1:
+        # Downmix to mono the way librosa does (mean over channels)
+        y = np.mean(y, axis=1)
+    return y, sr
+
+def decode_with_av(data, sr=None):
+    """
+    Decode an audio file held in memory with PyAV
+
+    The first audio stream is decoded to float32 and, if ``sr`` is given,
+    resampled to it by libswresample while decoding, so no separate
+    resampling pass is needed. Channels are averaged to mono as in
+    ``decode_in_memory``. Returns the signal and its sample rate.
+    """
+    chunks = []
+    with av.open(io.BytesIO(data)) as container:
+        stream = container.streams.audio[0]
+        rate = sr or stream.codec_context.sample_rate
+        # Planar float32 at the target rate, keeping the channel layout
+        resampler = av.AudioResampler(format='fltp', rate=rate)
+        for frame in container.decode(stream):
+            chunks.extend(out.to_ndarray() for out in resampler.resample(frame))
+        chunks.extend(out.to_ndarray() for out in resampler.resample(None))
+    if not chunks:
+        return np.zeros(0, dtype=np.float32), rate
+    y = np.concatenate(chunks, axis=1)
+    return (y[0] if len(y) == 1 else np.mean(y, axis=0)), rate
+
+def iter_blocks(path, block_size=65536):
+    """
+    Read an audio file as consecutive mono float32 blocks
+
+    Only one block is held in memory at a time, so this pairs with
+    ``streaming.extract_features_stream`` for recordings too long to load
+    whole. Returns the sample rate and a generator of blocks.
+    """
+    info = sf.info(path)
+
+    def blocks():
+        for block in sf.blocks(path, blocksize=block_size, dtype='float32'):
+            if block.ndim > 1:
+                block = np.mean(block, axis=1)
+            yield block
+
+    return info.samplerate, blocks()
+
+def decode_from_disk(data, extension, tmp_dir=None):
+    """
+    Decode audio that soundfile cannot read from memory (webm, m4a, ...)
+
+    The bytes are written to a temporary file for librosa/audioread (which
+    shells out to ffmpeg) and the file is always removed afterwards.
+    """
+    import librosa
+    fd, path = tempfile.mkstemp(suffix='.' + extension, dir=tmp_dir)
+    try:
+        with stage('save'), os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return librosa.load(path, sr=None)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            # Ignore errors removing temp files in serverless environments
+            pass
+
+def decode_audio(data, extension, tmp_dir=None, sr=None):
+    """
+    Decode uploaded audio bytes to a mono float32 signal
+
+    Formats libsndfile supports are decoded from an in-memory buffer with no
+    filesystem I/O. Other codecs (webm, m4a), or buffers soundfile rejects,
+    are decoded in-process with PyAV when it is installed, and otherwise
+    fall back to a temporary file read through audioread and ffmpeg.
+
+    Parameters:
+    -----------
+    data : bytes
+        Encoded audio file contents
+    extension : str
+        File extension of the upload (e.g. 'wav', 'webm')
+    tmp_dir : str, optional
+        Directory for the disk fallback
+    sr : int, optional
+        Analysis sample rate. PyAV decodes straight to it; the other paths
+        return the native rate, left to ``apply_profile`` to resample.
+
+    Returns:
+    --------
+    y : numpy.ndarray
+        Audio signal
+    sr : int
+        Sample rate of ``y``
+
+    Raises DecodeError if the data cannot be decoded by any of them.
+    """
+    extension = extension.lower().lstrip('.')
+    if extension in IN_MEMORY_FORMATS:
+        try:
+            return decode_in_memory(data)
+        except Exception:
+            # Mislabelled or unusual files: let PyAV or librosa/audioread try
+            pass
+    if av is not None:
+        try:
+            return decode_with_av(data, sr)
+        except Exception:
+            pass
+    try:
+        return decode_from_disk(data, extension, tmp_dir)
+    except Exception as e:
+        raise decode_error(extension) from e
+
+def analysis_rate(profile=None):
+    """Sample rate an analysis profile resamples to (None for native)"""
+    return ANALYSIS_PROFILES.get(profile or ANALYSIS_PROFILE, {}).get('sr')
+
+def apply_profile(y, sr, profile=None, feature_backend=None):
+    """
+    Trim and resample a decoded signal according to an analysis profile
+
+    Long signals are cut down to the profile's ``max_duration`` first (as
+    evenly spaced segments when the profile has more than one), so the
+    resampler only processes the audio that will be analysed.
+
+    Parameters:
+    -----------
+    y : numpy.ndarray
+        Audio signal
+    sr : int
+        Sample rate of ``y``
+    profile : str, optional
+        Name of a profile in ANALYSIS_PROFILES; defaults to ANALYSIS_PROFILE
+    feature_backend : str, optional
+        Extraction backend ('auto', 'librosa' or 'numpy'); the NumPy backend
+        resamples without importing librosa. Defaults to FEATURE_BACKEND
+
+    Returns:
+    --------
+    y : numpy.ndarray
+        Signal to analyse
+    sr : int
+        Sample rate of the returned signal
+    info : dict
+        The profile name and settings with the original and analysed
+        durations in seconds
+    """
+    name = profile or ANALYSIS_PROFILE
+    if name not in ANALYSIS_PROFILES:
+        raise ValueError(f"Unknown analysis profile '{name}'. Choose one of: {', '.join(ANALYSIS_PROFILES)}")
+    settings = ANALYSIS_PROFILES[name]
+    duration = len(y) / sr
+
+    max_duration = settings['max_duration']
+    if max_duration is not None and duration > max_duration:
+        segments = settings['segments']
+        segment_length = int(max_duration * sr) // segments
+        starts = np.linspace(0, len(y) - segment_length, segments).astype(int)
+        y = np.concatenate([y[start:start + segment_length] for start in starts])
+
+    if settings['sr'] is not None and settings['sr'] != sr:
+        from feature_extractor import load_librosa, resolve_backend
+        librosa = load_librosa() if resolve_backend(feature_backend) == 'librosa' else None
+        if librosa is not None:
+            y = librosa.resample(y, orig_sr=sr, target_sr=settings['sr'], res_type='polyphase')
+        else:
+            import numpy_features
+            y = numpy_features.resample(y, sr, settings['sr'])
+        sr = settings['sr']
+
+    info = dict(settings, name=name, duration=round(duration, 3),
+                analysed_duration=round(len(y) / sr, 3))
+    return y, sr, info
@@ -0,0 +1,87 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import metrics
+from audio_io import DecodeError
+
+# Clips and total upload bytes accepted by one POST /predict/batch, and the
+# worker threads (shared by all batch requests of a process) running them
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 32))
+BATCH_MAX_BYTES = int(os.environ.get('BATCH_MAX_BYTES', 64 * 1024 * 1024))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 2))
+
+class BatchRunner:
+    """
+    Runs the clips of batch requests on a bounded thread pool
+
+    Each batch keeps at most ``workers`` clips in flight, so concurrent
+    batches share the pool instead of queueing behind each other, and a
+    batch whose client disconnects stops submitting clips.
+    """
+    def __init__(self, run, workers=BATCH_WORKERS):
+        self.run = run
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch')
+
+    def stream(self, items):
+        """
+        Yield one NDJSON line per clip, in the order the clips finish
+
+        Parameters:
+        -----------
+        items : list of dict
+            Clips with 'index', 'filename' and either 'error' (rejected
+            before running) or the ``run`` arguments 'data', 'extension'
+            and 'gender'
+
+        A finished clip's line is the ``run`` result with its 'index' and
+        'filename'; a failed clip's line has 'index', 'filename' and 'error'.
+        """
+        start = time.perf_counter()
+        runnable = []
+        for item in items:
+            if 'error' in item:
+                yield self._line(item, error=item['error'], status=400)
+            else:
+                runnable.append(item)
+
+        pending = {}
+        queue = iter(runnable)
+        try:
+            while True:
+                for item in queue:
+                    future = self._executor.submit(self.run, item['data'], item['extension'], item['gender'])
+                    pending[future] = item
+                    if len(pending) >= self.workers:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    # Release the upload as soon as its clip is done
+                    item['data'] = None
+                    try:
+                        line = self._line(item, result=future.result())
+                    except DecodeError as e:
+                        line = self._line(item, error=str(e), status=400)
+                    except Exception as e:
+                        line = self._line(item, error=str(e) or type(e).__name__)
+                    yield line
+        finally:
+            # Client went away: drop the clips that have not started
+            for future in pending:
+                future.cancel()
+            metrics.observe('request_seconds', time.perf_counter() - start, endpoint='predict_batch')
+
+    def _line(self, item, result=None, error=None, status=500):
+        metrics.increment('requests_total', endpoint='predict_batch', extension=item['extension'],
+                          status=200 if error is None else status)
+        record = {'index': item['index'], 'filename': item['filename']}
+        if error is None:
+            record.update(result)
+        else:
+            record['error'] = error
+        return json.dumps(record) + '\n'
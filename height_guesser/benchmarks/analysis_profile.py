@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Accuracy/latency trade-off of the analysis profiles
+
+For long 48 kHz synthetic voices, applies each profile in
+audio_io.ANALYSIS_PROFILES, extracts the full feature dict and predicts a
+height. Reports the time taken (profile application included) and the
+deviation of f0_mean and the predicted height from the 'full' profile, plus
+the relative deviation of every other feature. Features that drift by more
+than DRIFT_THRESHOLD are listed by name: spectral statistics depend on the
+sample rate, so the profiles are only near-equivalent for F0 and height.
+
+Usage:
+    python benchmarks/analysis_profile.py [--backend pyin] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add the application directory to the path to import local modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_io import apply_profile, ANALYSIS_PROFILES
+from feature_extractor import extract_features_from_audio
+from height_predictor import HeightPredictor
+from pitch import PITCH_BACKENDS
+from synthetic import synthetic_voice
+
+DURATIONS = [5, 20, 60]
+SAMPLE_RATE = 48000
+
+# Relative change from the 'full' profile above which a feature is reported
+DRIFT_THRESHOLD = 0.01
+
+def run_profile(y, sr, profile, backend):
+    start = time.perf_counter()
+    y, sr, info = apply_profile(y, sr, profile)
+    features = extract_features_from_audio(y, sr, pitch_backend=backend)
+    return features, time.perf_counter() - start, info
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analysis profiles on long uploads')
+    parser.add_argument('--backend', choices=PITCH_BACKENDS, default='pyin', help='Pitch backend')
+    parser.add_argument('--durations', type=float, nargs='+', default=DURATIONS, help='Clip lengths in seconds')
+    parser.add_argument('--f0', type=float, default=120.0, help='F0 of the synthetic voice')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    predictor = HeightPredictor()
+    # Warm up JIT-compiled code so the first row is not penalized
+    run_profile(synthetic_voice(duration=1.0, sr=SAMPLE_RATE), SAMPLE_RATE, 'full', args.backend)
+
+    rows = []
+    print(f"{'dur s':>6} {'profile':>8} | {'analysed s':>10} {'time s':>7} {'speedup':>7} | "
+          f"{'d f0 Hz':>7} {'d height':>8} | largest relative feature change")
+    for duration in args.durations:
+        y = synthetic_voice(f0=args.f0, duration=duration, sr=SAMPLE_RATE)
+        reference = None
+        for profile in ANALYSIS_PROFILES:
+            features, elapsed, info = run_profile(y, SAMPLE_RATE, profile, args.backend)
+            height, _ = predictor.predict(features)
+            if reference is None:
+                reference = (features, elapsed, height)
+            ref_features, ref_elapsed, ref_height = reference
+            relative = {k: float(abs(features[k] - ref_features[k]) / max(abs(ref_features[k]), 1e-9))
+                        for k in ref_features}
+            worst = max(relative, key=relative.get)
+            row = {
+                'duration': duration,
+                'profile': info,
+                'seconds': elapsed,
+                'speedup': ref_elapsed / elapsed,
+                'f0_mean_delta_hz': float(features['f0_mean'] - ref_features['f0_mean']),
+                'height_delta_cm': height - ref_height,
+                'relative_feature_delta': relative,
+                'drifting_features': sorted(k for k, delta in relative.items() if delta > DRIFT_THRESHOLD),
+            }
+            rows.append(row)
+            print(f"{duration:>6.0f} {profile:>8} | {info['analysed_duration']:>10.1f} {elapsed:>7.2f} "
+                  f"{row['speedup']:>6.1f}x | {row['f0_mean_delta_hz']:>7.2f} {row['height_delta_cm']:>8.1f} | "
+                  f"{worst} {relative[worst]:.3f}")
+
+    # Features any reduced profile changes by more than the threshold
+    drifting = {}
+    for row in rows:
+        for name in row['drifting_features']:
+            drifting[name] = max(drifting.get(name, 0), row['relative_feature_delta'][name])
+    if drifting:
+        print(f"\nFeatures changed by more than {DRIFT_THRESHOLD:.0%} (largest relative change):")
+        for name, delta in sorted(drifting.items(), key=lambda item: -item[1]):
+            print(f"  {name:<24} {delta:.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
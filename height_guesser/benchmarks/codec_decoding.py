@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Measure decode latency of browser codecs: in-process PyAV vs ffmpeg subprocess
+
+Synthetic clips are encoded as webm (Opus, what Chrome's MediaRecorder
+produces), m4a (AAC, Safari) and mp3, then decoded with the previous path
+(temporary file, librosa/audioread, one ffmpeg process per file) and with
+audio_io.decode_with_av at the native rate and straight to the 16 kHz
+analysis rate of the 'speech' profile (compared with the disk path
+followed by apply_profile's resampling). The disk path needs ffmpeg on PATH
+and is reported as unavailable without it.
+
+Usage:
+    python benchmarks/codec_decoding.py [--repeat 20] [--duration 5] [--json results.json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+import numpy as np
+import av
+
+# Add the application directory to the path to import local modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_io import apply_profile, decode_from_disk, decode_with_av
+from synthetic import synthetic_voice
+
+# Extension: (container format, codec, encoder sample rate)
+FORMATS = {
+    'webm': ('webm', 'libopus', 48000),
+    'm4a': ('ipod', 'aac', 44100),
+    'mp3': ('mp3', 'libmp3lame', 44100),
+}
+ANALYSIS_SR = 16000
+
+def encode(y, sr, container_format, codec):
+    """Encode a mono float32 signal with PyAV"""
+    buffer = io.BytesIO()
+    with av.open(buffer, mode='w', format=container_format) as container:
+        stream = container.add_stream(codec, rate=sr)
+        stream.layout = 'mono'
+        frame = av.AudioFrame.from_ndarray(y[np.newaxis, :].astype(np.float32), format='fltp', layout='mono')
+        frame.sample_rate = sr
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+def disk_at_analysis_rate(data, extension):
+    """The previous path to a 16 kHz signal: decode from disk, then resample"""
+    y, sr = decode_from_disk(data, extension)
+    return apply_profile(y, sr, 'speech')
+
+def median_ms(func, repeat, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+def _ms(value, width):
+    return f"{value:>{width}.1f}" if value is not None else f"{'n/a':>{width}}"
+
+def _speedup(before, after):
+    return f"{before / after:>6.1f}x" if before is not None else f"{'n/a':>7}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare in-process and subprocess decoding of browser codecs')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per format and path')
+    parser.add_argument('--duration', type=float, default=5.0, help='Clip length in seconds')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    rows = []
+    print(f"{'format':>6} {'KB':>5} | {'disk ms':>8} {'av ms':>7} {'speedup':>7} | "
+          f"{'disk 16k ms':>11} {'av 16k ms':>9} {'speedup':>7}")
+    for extension, (container_format, codec, sr) in FORMATS.items():
+        y = synthetic_voice(duration=args.duration, sr=sr)
+        data = encode(y, sr, container_format, codec)
+
+        try:
+            decode_from_disk(data, extension)
+            disk = median_ms(decode_from_disk, args.repeat, data, extension)
+            disk_resampled = median_ms(disk_at_analysis_rate, args.repeat, data, extension)
+        except Exception:
+            # No ffmpeg (or audioread backend) on this machine
+            disk = disk_resampled = None
+        decode_with_av(data)
+        native = median_ms(decode_with_av, args.repeat, data)
+        resampled = median_ms(decode_with_av, args.repeat, data, ANALYSIS_SR)
+
+        decoded, decoded_sr = decode_with_av(data)
+        rows.append({'format': extension, 'codec': codec, 'bytes': len(data), 'disk_ms': disk,
+                     'av_ms': native, 'disk_16k_ms': disk_resampled, 'av_16k_ms': resampled,
+                     'decoded_sr': decoded_sr, 'decoded_seconds': len(decoded) / decoded_sr})
+        print(f"{extension:>6} {len(data) / 1024:>5.0f} | {_ms(disk, 8)} {native:>7.1f} {_speedup(disk, native)} | "
+              f"{_ms(disk_resampled, 11)} {resampled:>9.1f} {_speedup(disk_resampled, resampled)}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
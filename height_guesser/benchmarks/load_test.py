@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Load-test /predict at increasing concurrency and report latency percentiles
+
+Synthetic male and female voices of several durations are encoded in mixed
+formats (WAV, FLAC, OGG, and webm when PyAV is installed) and posted to
+/predict by a closed loop of client threads: each thread sends its next
+request as soon as the previous one returns. For every concurrency level
+the script reports throughput, p50/p95/p99 latency, the error rate and the
+mean of each stage in the server's Server-Timing header.
+
+The target is started locally (gunicorn if installed, otherwise Flask's
+threaded development server), or an already running deployment is given
+with --url:
+
+    python benchmarks/load_test.py --app app --concurrency 1 2 4 8 --json load.json
+    python benchmarks/load_test.py --app static --workers 4
+    python benchmarks/load_test.py --url http://localhost:5000
+
+Local servers start with FEATURE_CACHE_SIZE=0, so the repeated clips are
+extracted every time; pass --env FEATURE_CACHE_SIZE=256 to measure with the
+cache. Against --url, disable the cache on the deployment the same way.
+
+Run the load generator on a different machine (or at least on spare cores)
+when measuring a production-sized deployment; on the same host it competes
+with the server for CPU.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+import platform
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+import numpy as np
+import soundfile as sf
+
+# Add the application directory to the path to import local modules
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(APP_DIR)
+
+from synthetic import synthetic_voice
+
+# App name: (working directory, WSGI module)
+APPS = {
+    'app': (APP_DIR, 'app'),
+    'static': (os.path.join(os.path.dirname(APP_DIR), 'deployment'), 'static_version'),
+}
+
+VOICES = [('male', 110), ('female', 210)]
+DURATIONS = [1, 3, 10]
+SAMPLE_RATE = 22050
+
+# Extension: soundfile format (None: encoded with PyAV)
+FORMATS = {'wav': 'WAV', 'flac': 'FLAC', 'ogg': 'OGG', 'webm': None}
+
+# Development server for targets without gunicorn
+DEV_SERVER = ("import sys, importlib; sys.path.insert(0, '.'); "
+              "app = importlib.import_module(sys.argv[1]).app; "
+              "app.run(host='127.0.0.1', port=int(sys.argv[2]), threaded=True)")
+
+def encode(y, sr, extension):
+    """Encoded file contents of a signal, or None if the format is unavailable"""
+    if FORMATS[extension] is not None:
+        buffer = io.BytesIO()
+        sf.write(buffer, y, sr, format=FORMATS[extension])
+        return buffer.getvalue()
+    try:
+        from codec_decoding import encode as encode_with_av
+        return encode_with_av(y, sr, 'webm', 'libopus')
+    except ImportError:
+        return None
+
+def make_clips(seed=0):
+    """Request payloads covering every voice, duration and available format, shuffled"""
+    clips = []
+    for i, (duration, (gender, f0), extension) in enumerate(
+            (d, v, e) for d in DURATIONS for v in VOICES for e in FORMATS):
+        sr = 48000 if extension == 'webm' else SAMPLE_RATE
+        data = encode(synthetic_voice(f0=f0, duration=duration, sr=sr, seed=i), sr, extension)
+        if data is not None:
+            clips.append({'name': f'{gender}-{duration}s.{extension}', 'data': data, 'f0': f0,
+                          'duration': duration, 'extension': extension})
+    # Mixed durations and formats at every level, in the same order every run
+    order = np.random.default_rng(seed).permutation(len(clips))
+    return [clips[i] for i in order]
+
+def multipart(clip):
+    """multipart/form-data body posting a clip (and its F0, for the static app)"""
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="frequency"\r\n\r\n{clip["f0"]}\r\n'.encode(),
+        (f'--{boundary}\r\nContent-Disposition: form-data; name="audio"; filename="{clip["name"]}"\r\n'
+         f'Content-Type: application/octet-stream\r\n\r\n').encode(),
+        clip['data'],
+        f'\r\n--{boundary}--\r\n'.encode(),
+    ]
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+def parse_server_timing(header):
+    """Stage durations in milliseconds from a Server-Timing header"""
+    timings = {}
+    for entry in (header or '').split(','):
+        name, _, params = entry.strip().partition(';')
+        if params.startswith('dur='):
+            timings[name] = float(params[4:])
+    return timings
+
+def send(url, clip):
+    """Post one clip; returns (seconds, HTTP status or None, Server-Timing dict)"""
+    body, content_type = multipart(clip)
+    request = urllib.request.Request(url + '/predict', data=body, headers={'Content-Type': content_type})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            status, headers = response.status, response.headers
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, headers = e.code, e.headers
+    except OSError:
+        # Connection refused or reset, timeout
+        return time.perf_counter() - start, None, {}
+    return time.perf_counter() - start, status, parse_server_timing(headers.get('Server-Timing'))
+
+def run_level(url, clips, concurrency, requests_per_client):
+    """Closed-loop load at one concurrency level"""
+    samples = []
+    lock = threading.Lock()
+
+    def client(offset):
+        for i in range(requests_per_client):
+            clip = clips[(offset + i * concurrency) % len(clips)]
+            result = send(url, clip)
+            with lock:
+                samples.append((clip,) + result)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies = np.array([seconds for _, seconds, _, _ in samples])
+    ok = [status == 200 for _, _, status, _ in samples]
+    stages = {}
+    for _, _, _, timings in samples:
+        for name, ms in timings.items():
+            stages.setdefault(name, []).append(ms)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'seconds': round(wall, 3),
+        'throughput_rps': round(len(samples) / wall, 3),
+        'audio_seconds_per_second': round(sum(c['duration'] for c, *_ in samples) / wall, 3),
+        'p50_ms': round(float(p50), 1),
+        'p95_ms': round(float(p95), 1),
+        'p99_ms': round(float(p99), 1),
+        'max_ms': round(float(latencies.max()) * 1000, 1),
+        'error_rate': round(1 - sum(ok) / len(ok), 4),
+        'statuses': {str(s): sum(1 for _, _, status, _ in samples if status == s)
+                     for s in sorted({status for _, _, status, _ in samples}, key=str)},
+        'server_stage_mean_ms': {name: round(float(np.mean(values)), 2) for name, values in stages.items()},
+    }
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(name, workers, threads, env):
+    """Start an app on a free local port; returns the process and its URL"""
+    directory, module = APPS[name]
+    port = free_port()
+    try:
+        import gunicorn  # noqa: F401
+        command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+                   '--threads', str(threads), '--timeout', '300', f'{module}:app']
+        server = 'gunicorn'
+    except ImportError:
+        command = [sys.executable, '-c', DEV_SERVER, module, str(port)]
+        server = 'flask'
+    process = subprocess.Popen(command, cwd=directory, env=dict(os.environ, **env),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with status {process.returncode} during startup")
+        try:
+            urllib.request.urlopen(url + '/', timeout=5).read()
+            return process, url, server
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"{name} did not start within 180 seconds")
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test /predict at increasing concurrency')
+    parser.add_argument('--app', choices=sorted(APPS), default='app', help='App to start locally')
+    parser.add_argument('--url', help='Test a running deployment instead of starting one')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Concurrent clients of each level')
+    parser.add_argument('--requests', type=int, default=10, help='Requests per client and level')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers of a local server')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--max-p99', type=float, help='Stop the sweep once p99 latency exceeds this (ms)')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='Environment of a local server (repeatable), e.g. PITCH_BACKEND=yin')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    clips = make_clips()
+    print(f"{len(clips)} clips: formats {sorted({c['extension'] for c in clips})}, durations {DURATIONS} s")
+
+    process = None
+    server = 'external'
+    url = args.url
+    if url is None:
+        env = dict([('FEATURE_CACHE_SIZE', '0')] + [item.split('=', 1) for item in args.env])
+        process, url, server = start_server(args.app, args.workers, args.threads, env)
+        print(f"Started {args.app} with {server} at {url}")
+    url = url.rstrip('/')
+
+    levels = []
+    try:
+        # One pass over the clips so warm-up and JIT compilation are not measured
+        for clip in clips:
+            send(url, clip)
+        print(f"\n{'conc':>4} {'req':>5} | {'req/s':>6} {'audio s/s':>9} | {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} | {'errors':>6} | stages (mean ms)")
+        for concurrency in args.concurrency:
+            level = run_level(url, clips, concurrency, args.requests)
+            levels.append(level)
+            stages = ', '.join(f'{name} {ms:.0f}' for name, ms in level['server_stage_mean_ms'].items()
+                               if name in ('decode', 'extract', 'service', 'predict', 'total'))
+            print(f"{concurrency:>4} {level['requests']:>5} | {level['throughput_rps']:>6.2f} "
+                  f"{level['audio_seconds_per_second']:>9.1f} | {level['p50_ms']:>8.1f} {level['p95_ms']:>8.1f} "
+                  f"{level['p99_ms']:>8.1f} | {level['error_rate']:>6.1%} | {stages}")
+            if args.max_p99 is not None and level['p99_ms'] > args.max_p99:
+                print(f"p99 above {args.max_p99} ms, stopping")
+                break
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        report = {
+            'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'cpus': os.cpu_count()},
+            'config': {'app': None if args.url else args.app, 'url': url, 'server': server,
+                       'workers': args.workers, 'threads': args.threads, 'requests_per_client': args.requests,
+                       'env': args.env, 'clips': [{k: c[k] for k in ('name', 'duration', 'extension')}
+                                                  for c in clips]},
+            'levels': levels,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Check the NumPy feature backend against librosa and compare their costs
+
+Every feature is extracted from synthetic voices (several F0 values and
+sample rates) with both backends, using the same F0 tracker (yin) so that
+only the spectral code differs, and compared within
+numpy_features.NUMPY_RTOL. Extraction time and the time to import each
+backend in a fresh interpreter are reported alongside.
+
+Usage:
+    python benchmarks/numpy_backend.py [--duration 3] [--json results.json]
+
+Exits with status 1 if any feature disagrees beyond the tolerance.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# Add the application directory to the path to import local modules
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(APP_DIR)
+
+from feature_extractor import extract_features_from_audio
+from numpy_features import NUMPY_RTOL
+from synthetic import synthetic_voice
+
+F0_VALUES = [110, 210]
+SAMPLE_RATES = [16000, 22050, 44100]
+
+# Absolute slack for features that are close to zero (MFCC means, in dB)
+ATOL = 1e-3
+
+# What each backend imports before it can extract features
+IMPORTS = {
+    'librosa': 'import librosa, librosa.feature, librosa.filters',
+    'numpy': 'import numpy_features, soundfile',
+}
+
+def import_seconds(backend, repeat=3):
+    """Fastest time to import a backend's modules in a fresh interpreter"""
+    code = ('import time; start = time.perf_counter(); ' + IMPORTS[backend] +
+            '; print(time.perf_counter() - start)')
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, check=True,
+                                capture_output=True, text=True).stdout
+        times.append(float(output))
+    return min(times)
+
+def compare(f0, sr, duration):
+    """Extract one synthetic voice with both backends and collect differences"""
+    y = synthetic_voice(f0=f0, duration=duration, sr=sr)
+    row = {'f0': f0, 'sr': sr, 'duration': duration}
+    features = {}
+    for backend in ('librosa', 'numpy'):
+        start = time.perf_counter()
+        features[backend] = extract_features_from_audio(y, sr, pitch_backend='yin',
+                                                        feature_backend=backend)
+        row[f'{backend}_seconds'] = time.perf_counter() - start
+
+    reference, candidate = features['librosa'], features['numpy']
+    errors = {}
+    for name, expected in reference.items():
+        scale = max(abs(float(expected)), ATOL / NUMPY_RTOL)
+        errors[name] = abs(float(candidate[name]) - float(expected)) / scale
+    worst = max(errors, key=errors.get)
+    row['max_relative_error'] = errors[worst]
+    row['worst_feature'] = worst
+    row['agrees'] = errors[worst] <= NUMPY_RTOL
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the NumPy feature backend against librosa')
+    parser.add_argument('--duration', type=float, default=3.0, help='Signal length in seconds')
+    parser.add_argument('--json', help='Write the full results to this JSON file')
+    args = parser.parse_args()
+
+    imports = {backend: import_seconds(backend) for backend in IMPORTS}
+    print(f"Import time: librosa {imports['librosa']:.3f}s, numpy {imports['numpy']:.3f}s "
+          f"({imports['numpy'] / imports['librosa']:.0%})\n")
+
+    # First call of each backend pays for lazy imports and JIT compilation
+    warm_up = synthetic_voice(duration=0.5)
+    for backend in ('librosa', 'numpy'):
+        extract_features_from_audio(warm_up, 22050, pitch_backend='yin', feature_backend=backend)
+
+    rows = []
+    print(f"{'f0':>5} {'sr':>6} | {'librosa s':>9} {'numpy s':>8} | {'max rel err':>11} {'worst feature':<24}")
+    for sr in SAMPLE_RATES:
+        for f0 in F0_VALUES:
+            row = compare(f0, sr, args.duration)
+            rows.append(row)
+            flag = '' if row['agrees'] else '  MISMATCH'
+            print(f"{f0:>5} {sr:>6} | {row['librosa_seconds']:>9.3f} {row['numpy_seconds']:>8.3f} | "
+                  f"{row['max_relative_error']:>11.2e} {row['worst_feature']:<24}{flag}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'import_seconds': imports, 'rtol': NUMPY_RTOL, 'results': rows}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 0 if all(row['agrees'] for row in rows) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare the fast YIN pitch backend against librosa.pyin on synthetic voices
+
+For each synthetic signal (known F0, several sample rates) both backends are
+timed and their f0_mean/f0_std/f0_min/f0_max features are compared with the
+ground truth and with each other.
+
+Usage:
+    python benchmarks/pitch_accuracy.py [--duration 3] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+# Add the application directory to the path to import local modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pitch import estimate_f0, f0_statistics, HOP_LENGTH
+from synthetic import synthetic_voice
+
+F0_VALUES = [85, 110, 140, 180, 220, 280]
+SAMPLE_RATES = [16000, 22050, 44100]
+
+def cents(a, b):
+    """Pitch difference between two frequencies in cents"""
+    return 1200 * np.log2(a / b)
+
+def compare(f0, sr, duration, backends=('pyin', 'yin')):
+    """Run every backend on one synthetic voice and collect errors"""
+    y, contour = synthetic_voice(f0=f0, duration=duration, sr=sr, return_f0=True)
+    # Ground-truth F0 at the centre of each analysis frame
+    centres = np.clip(np.arange(0, len(y) + 1, HOP_LENGTH), 0, len(y) - 1)
+    truth = contour[centres]
+
+    row = {'f0': f0, 'sr': sr, 'duration': duration}
+    tracks = {}
+    for backend in backends:
+        start = time.perf_counter()
+        track = estimate_f0(y, sr, backend=backend)
+        elapsed = time.perf_counter() - start
+        tracks[backend] = track
+        n = min(len(track), len(truth))
+        voiced = ~np.isnan(track[:n])
+        errors = np.abs(cents(track[:n][voiced], truth[:n][voiced]))
+        stats = f0_statistics(track)
+        row[backend] = {
+            'seconds': elapsed,
+            'voiced_fraction': float(np.mean(voiced)),
+            'median_abs_cents': float(np.median(errors)) if len(errors) else None,
+            'gross_error_rate': float(np.mean(errors > 50)) if len(errors) else None,
+            'f0_mean_error_hz': float(stats['f0_mean'] - np.mean(contour)),
+            'features': {k: float(v) for k, v in stats.items()},
+        }
+
+    if 'pyin' in tracks and 'yin' in tracks:
+        both = ~np.isnan(tracks['pyin']) & ~np.isnan(tracks['yin'])
+        diff = np.abs(cents(tracks['yin'][both], tracks['pyin'][both]))
+        row['yin_vs_pyin_median_cents'] = float(np.median(diff)) if both.any() else None
+        row['speedup'] = row['pyin']['seconds'] / max(row['yin']['seconds'], 1e-9)
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare pitch backends on synthetic voices')
+    parser.add_argument('--duration', type=float, default=3.0, help='Signal length in seconds')
+    parser.add_argument('--json', help='Write the full results to this JSON file')
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'f0':>5} {'sr':>6} | {'pyin s':>7} {'yin s':>7} {'speedup':>7} | "
+          f"{'pyin err Hz':>11} {'yin err Hz':>10} {'yin gross':>9} {'yin~pyin c':>10}")
+    for sr in SAMPLE_RATES:
+        for f0 in F0_VALUES:
+            row = compare(f0, sr, args.duration)
+            rows.append(row)
+            print(f"{f0:>5} {sr:>6} | {row['pyin']['seconds']:>7.3f} {row['yin']['seconds']:>7.3f} "
+                  f"{row['speedup']:>6.1f}x | {row['pyin']['f0_mean_error_hz']:>11.2f} "
+                  f"{row['yin']['f0_mean_error_hz']:>10.2f} {row['yin']['gross_error_rate']:>9.3f} "
+                  f"{row['yin_vs_pyin_median_cents']:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Time the 'speech' coarse-to-fine pitch range against the full C2-C7 search
+
+For synthetic voices across the adult speech range, runs the selected
+backend with both pitch ranges and reports wall time, speedup, the narrowed
+band chosen by the coarse pass and the difference in f0_mean.
+
+Usage:
+    python benchmarks/pitch_range.py [--backend pyin] [--duration 3] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add the application directory to the path to import local modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pitch import estimate_f0, f0_statistics, speech_pitch_band, PITCH_BACKENDS
+from synthetic import synthetic_voice
+
+F0_VALUES = [85, 110, 140, 180, 220, 280]
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full-range and speech-range pitch tracking')
+    parser.add_argument('--backend', choices=PITCH_BACKENDS, default='pyin', help='Pitch backend to time')
+    parser.add_argument('--duration', type=float, default=3.0, help='Signal length in seconds')
+    parser.add_argument('--sr', type=int, default=22050, help='Sample rate of the synthetic voices')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    # Warm up JIT-compiled code so the first row is not penalized
+    estimate_f0(synthetic_voice(duration=0.5, sr=args.sr), args.sr, backend=args.backend)
+
+    rows = []
+    print(f"{'f0':>5} | {'full s':>7} {'speech s':>8} {'speedup':>7} | {'band Hz':>13} | {'d f0_mean Hz':>12}")
+    for f0 in F0_VALUES:
+        y = synthetic_voice(f0=f0, duration=args.duration, sr=args.sr)
+        full, full_time = timed(estimate_f0, y, args.sr, backend=args.backend, pitch_range='full')
+        speech, speech_time = timed(estimate_f0, y, args.sr, backend=args.backend, pitch_range='speech')
+        band, band_time = timed(speech_pitch_band, y, args.sr)
+        delta = f0_statistics(speech)['f0_mean'] - f0_statistics(full)['f0_mean']
+        rows.append({
+            'f0': f0,
+            'backend': args.backend,
+            'full_seconds': full_time,
+            'speech_seconds': speech_time,
+            'coarse_pass_seconds': band_time,
+            'band': [float(band[0]), float(band[1])],
+            'f0_mean_delta_hz': float(delta),
+        })
+        print(f"{f0:>5} | {full_time:>7.3f} {speech_time:>8.3f} {full_time / speech_time:>6.1f}x | "
+              f"{band[0]:>5.0f}-{band[1]:<7.0f} | {delta:>12.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
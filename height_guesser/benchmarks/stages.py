@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Per-stage timings of the prediction pipeline on synthetic voices
+
+Writes deterministic synthetic voices (harmonic glottal-pulse spectra at a
+known F0 with formant resonances and noise) at several durations and sample
+rates to WAV files, then times every stage /predict runs: loading, the STFT
+shared by the spectral features, F0 tracking, MFCC, mel, spectral, ZCR and
+RMS features, the summary statistics, features_to_vector and
+HeightPredictor.predict. Each stage reports the median of several repeats.
+
+Save a baseline, then compare a later run (e.g. after a librosa upgrade)
+against it; stages slower than the baseline by more than --threshold are
+flagged and the exit status is 1:
+
+    python benchmarks/stages.py --json baseline.json
+    python benchmarks/stages.py --compare baseline.json [--json current.json]
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import numpy as np
+
+# Add the application directory to the path to import local modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import soundfile as sf
+from feature_extractor import FeatureGraph, features_to_vector, load_librosa
+from height_predictor import HeightPredictor
+from pitch import PITCH_BACKENDS
+from synthetic import synthetic_voice, MALE_FORMANTS, FEMALE_FORMANTS
+
+VOICES = {
+    'male': {'f0': 110.0, 'formants': MALE_FORMANTS},
+    'female': {'f0': 210.0, 'formants': FEMALE_FORMANTS},
+}
+DURATIONS = [1, 3, 10]
+SAMPLE_RATES = [16000, 22050, 44100]
+
+# Graph nodes timed by each stage, in pipeline order. The STFT is shared by
+# every spectral stage, so it is timed on its own.
+STAGE_NODES = {
+    'stft': ['stft'],
+    'f0': ['f0'],
+    'mfcc': ['power', 'mfcc'],
+    'mel': ['mel_db'],
+    'spectral': ['spectral_centroid', 'spectral_bandwidth', 'spectral_rolloff'],
+    'zcr': ['zcr'],
+    'rms': ['rms'],
+}
+STAGES = ['load'] + list(STAGE_NODES) + ['statistics', 'features_to_vector', 'predict']
+
+# Differences below this many seconds are treated as timer noise in --compare
+MIN_DELTA = 0.002
+
+def time_pipeline(path, backend, predictor):
+    """Seconds spent in each stage for one run over a WAV file"""
+    librosa = load_librosa()
+    timings = {}
+
+    start = time.perf_counter()
+    y, sr = librosa.load(path, sr=None)
+    timings['load'] = time.perf_counter() - start
+
+    graph = FeatureGraph(y, sr, pitch_backend=backend)
+    for stage, nodes in STAGE_NODES.items():
+        start = time.perf_counter()
+        for node in nodes:
+            graph.get(node)
+        timings[stage] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    features = graph.features()
+    timings['statistics'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    features_to_vector(features)
+    timings['features_to_vector'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictor.predict(features)
+    timings['predict'] = time.perf_counter() - start
+
+    return timings, features
+
+def run(args):
+    predictor = HeightPredictor()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Warm up JIT-compiled code so the first row is not penalized
+        warm_path = os.path.join(tmp_dir, 'warmup.wav')
+        sf.write(warm_path, synthetic_voice(duration=1.0), 22050)
+        time_pipeline(warm_path, args.backend, predictor)
+
+        for voice in args.voices:
+            for sr in args.sample_rates:
+                for duration in args.durations:
+                    y = synthetic_voice(f0=VOICES[voice]['f0'], formants=VOICES[voice]['formants'],
+                                        duration=duration, sr=sr)
+                    path = os.path.join(tmp_dir, f'{voice}_{sr}_{duration}.wav')
+                    sf.write(path, y, sr)
+                    runs = []
+                    for _ in range(args.repeat):
+                        timings, features = time_pipeline(path, args.backend, predictor)
+                        runs.append(timings)
+                    stages = {stage: float(np.median([r[stage] for r in runs])) for stage in STAGES}
+                    results.append({
+                        'voice': voice,
+                        'sr': sr,
+                        'duration': duration,
+                        'stages': stages,
+                        'total': sum(stages.values()),
+                        'f0_error_hz': float(features['f0_mean'] - VOICES[voice]['f0']),
+                    })
+                    print_row(results[-1])
+    return results
+
+def print_header():
+    print(f"{'voice':>6} {'sr':>6} {'dur s':>5} | " + ' '.join(f'{s[:8]:>8}' for s in STAGES)
+          + f" | {'total':>7}")
+
+def print_row(row):
+    print(f"{row['voice']:>6} {row['sr']:>6} {row['duration']:>5g} | "
+          + ' '.join(f"{row['stages'][s] * 1000:>8.2f}" for s in STAGES)
+          + f" | {row['total'] * 1000:>7.1f}")
+
+def compare(results, baseline, threshold, min_delta=MIN_DELTA):
+    """
+    Stages slower than the baseline by more than ``threshold`` (relative)
+
+    Rows are matched on voice, sample rate and duration; rows or stages
+    missing from either run are ignored.
+    """
+    reference = {(r['voice'], r['sr'], r['duration']): r for r in baseline['results']}
+    regressions = []
+    for row in results:
+        base = reference.get((row['voice'], row['sr'], row['duration']))
+        if base is None:
+            continue
+        for stage in list(row['stages']) + ['total']:
+            current = row['total'] if stage == 'total' else row['stages'][stage]
+            previous = base['total'] if stage == 'total' else base['stages'].get(stage)
+            if previous is None:
+                continue
+            if current > previous * (1 + threshold) and current - previous > min_delta:
+                regressions.append({
+                    'voice': row['voice'],
+                    'sr': row['sr'],
+                    'duration': row['duration'],
+                    'stage': stage,
+                    'baseline': previous,
+                    'current': current,
+                    'ratio': current / previous,
+                })
+    return regressions
+
+def environment():
+    librosa = load_librosa()
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'librosa': getattr(librosa, '__version__', None),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark each stage of the prediction pipeline')
+    parser.add_argument('--backend', choices=PITCH_BACKENDS, default='pyin', help='Pitch backend')
+    parser.add_argument('--voices', nargs='+', choices=list(VOICES), default=list(VOICES), help='Synthetic voices')
+    parser.add_argument('--durations', type=float, nargs='+', default=DURATIONS, help='Clip lengths in seconds')
+    parser.add_argument('--sample-rates', type=int, nargs='+', default=SAMPLE_RATES, help='Sample rates in Hz')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per configuration (median is reported)')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown flagged as a regression (default: 0.2)')
+    args = parser.parse_args()
+
+    print("Stage medians in ms")
+    print_header()
+    report = {
+        'environment': environment(),
+        'config': {'backend': args.backend, 'repeat': args.repeat},
+        'results': run(args),
+    }
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('config', {}).get('backend') != args.backend:
+            print(f"\nWarning: baseline used the {baseline.get('config', {}).get('backend')} backend")
+        regressions = compare(report['results'], baseline, args.threshold)
+        report['regressions'] = regressions
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for r in regressions:
+                print(f"  {r['voice']} {r['sr']} Hz {r['duration']:g} s {r['stage']}: "
+                      f"{r['baseline'] * 1000:.2f} -> {r['current'] * 1000:.2f} ms ({r['ratio']:.2f}x)")
+            status = 1
+        else:
+            print(f"\nNo regressions over {args.threshold:.0%} against {args.compare}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
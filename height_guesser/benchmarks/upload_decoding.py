@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Measure the per-request latency saved by decoding uploads in memory
+
+Compares the previous /predict upload path (save the upload to
+UPLOAD_FOLDER, librosa.load it back, delete it) with audio_io.decode_audio
+on synthetic clips encoded as WAV, FLAC and OGG.
+
+Usage:
+    python benchmarks/upload_decoding.py [--repeat 50] [--duration 5] [--json results.json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import numpy as np
+import soundfile as sf
+import librosa
+
+# Add the application directory to the path to import local modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_io import decode_audio
+from synthetic import synthetic_voice
+
+FORMATS = {'wav': 'WAV', 'flac': 'FLAC', 'ogg': 'OGG'}
+
+def disk_round_trip(data, extension, folder):
+    """The previous upload path: save, load with librosa, remove"""
+    path = os.path.join(folder, str(uuid.uuid4()) + '.' + extension)
+    with open(path, 'wb') as f:
+        f.write(data)
+    y, sr = librosa.load(path, sr=None)
+    os.remove(path)
+    return y, sr
+
+def median_ms(func, repeat, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare in-memory and disk upload decoding')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed runs per format and path')
+    parser.add_argument('--duration', type=float, default=5.0, help='Clip length in seconds')
+    parser.add_argument('--sr', type=int, default=44100, help='Sample rate of the clips')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    y = synthetic_voice(duration=args.duration, sr=args.sr)
+    folder = tempfile.mkdtemp(prefix='height_guesser_bench_')
+
+    rows = []
+    print(f"{'format':>6} {'KB':>6} | {'disk ms':>8} {'memory ms':>9} {'saved ms':>8}")
+    for extension, fmt in FORMATS.items():
+        buffer = io.BytesIO()
+        sf.write(buffer, y, args.sr, format=fmt)
+        data = buffer.getvalue()
+
+        # Warm up both paths once
+        disk_round_trip(data, extension, folder)
+        decode_audio(data, extension)
+
+        disk = median_ms(disk_round_trip, args.repeat, data, extension, folder)
+        memory = median_ms(decode_audio, args.repeat, data, extension)
+        rows.append({'format': extension, 'bytes': len(data), 'disk_ms': disk,
+                     'memory_ms': memory, 'saved_ms': disk - memory})
+        print(f"{extension:>6} {len(data) / 1024:>6.0f} | {disk:>8.2f} {memory:>9.2f} {disk - memory:>8.2f}")
+
+    os.rmdir(folder)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
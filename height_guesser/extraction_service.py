@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Micro-batching extraction service shared by the web workers
+
+One long-lived process keeps librosa, the numba-compiled code and the
+model loaded, and serves every gunicorn worker over a Unix socket:
+
+    python extraction_service.py --socket /tmp/height_guesser_extraction.sock
+    EXTRACTION_SERVICE=/tmp/height_guesser_extraction.sock gunicorn app:app
+
+Clips that arrive within SERVICE_BATCH_WAIT seconds of each other (up to
+SERVICE_BATCH_SIZE) form one micro-batch: their STFTs come from a single
+batched FFT, their F0 tracks from one YIN pass (with PITCH_BACKEND=yin and
+the full pitch range) and the heights from one vectorized prediction. pyin
+and the per-clip statistics still run clip by clip, so with the default
+F0-only model and pyin only the prediction is batched.
+
+Web workers authenticate with a shared key before anything is unpickled:
+EXTRACTION_SERVICE_KEY if set, otherwise a random key the service writes
+next to the socket (<socket>.key, readable only by its user).
+
+With EXTRACTION_SERVICE=inprocess the same batcher runs on a thread inside
+the web process (for threaded servers and tests); unset, app.py extracts
+features itself.
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import tempfile
+import threading
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+# Sets NUMBA_CACHE_DIR, so it must come before anything importing librosa
+import startup
+
+import metrics
+import numpy_features
+from feature_extractor import (N_FFT, HOP_LENGTH, extract_features_from_audio, feature_names,
+                               features_to_matrix, pad_signal, required_nodes, resolve_pitch_backend)
+from height_predictor import HeightPredictor
+from pitch import PITCH_BACKEND, PITCH_RANGE, yin_batch
+
+# Where app.py gets features: unset (extract in the web worker), 'inprocess'
+# or the path of the service's Unix socket
+EXTRACTION_SERVICE = os.environ.get('EXTRACTION_SERVICE')
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'height_guesser_extraction.sock')
+
+# Shared secret of the service and its web workers; unset, the service
+# generates one per start and writes it to <socket>.key
+EXTRACTION_SERVICE_KEY = os.environ.get('EXTRACTION_SERVICE_KEY')
+
+# Largest micro-batch, seconds the first clip of a batch waits for others,
+# and clips allowed to wait before new ones are turned away
+SERVICE_BATCH_SIZE = int(os.environ.get('SERVICE_BATCH_SIZE', 8))
+SERVICE_BATCH_WAIT = float(os.environ.get('SERVICE_BATCH_WAIT', 0.01))
+SERVICE_QUEUE_SIZE = int(os.environ.get('SERVICE_QUEUE_SIZE', 64))
+
+class ServiceBusy(Exception):
+    """Raised when a clip is submitted while the service queue is full"""
+
+class MicroBatcher:
+    """
+    Groups concurrent prediction requests into micro-batches
+
+    Parameters:
+    -----------
+    predictor : HeightPredictor, optional
+        Model used for the batched prediction (a new one by default)
+    cache : feature_cache.FeatureCache, optional
+        Features of clips seen before are taken from it and new ones stored
+    batch_size : int
+        Largest number of clips in a batch
+    wait : float
+        Seconds a batch stays open for more clips after its first one
+    max_queue : int
+        Clips allowed to wait for a batch
+    """
+    def __init__(self, predictor=None, cache=None, batch_size=SERVICE_BATCH_SIZE, wait=SERVICE_BATCH_WAIT,
+                 max_queue=SERVICE_QUEUE_SIZE):
+        self.predictor = predictor or HeightPredictor()
+        self.cache = cache
+        self.batch_size = batch_size
+        self.wait = wait
+        self.max_queue = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.clips = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def predict(self, y, sr, gender=None, timeout=None):
+        """
+        Features and prediction of one decoded clip
+
+        Blocks until the clip's batch has run. Returns the feature dict and
+        the ``HeightPredictor.predict_batch`` result for this clip (arrays
+        of length 1).
+        """
+        future = Future()
+        try:
+            self._queue.put_nowait((y, sr, gender, time.perf_counter(), future))
+        except queue.Full:
+            raise ServiceBusy(f"Extraction queue is full ({self.max_queue} clips waiting)")
+        return future.result(timeout)
+
+    def stats(self):
+        """Batch counters, queue depth and settings"""
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'clips': self.clips,
+                'failed': self.failed,
+                'mean_batch_size': round(self.clips / self.batches, 2) if self.batches else None,
+                'queued': self._queue.qsize(),
+                'batch_size': self.batch_size,
+                'wait': self.wait,
+                'max_queue': self.max_queue,
+            }
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._run(batch)
+            except Exception as e:
+                # Never leave callers waiting on a batch that crashed
+                self._fail([item[-1] for item in batch if not item[-1].done()], e)
+
+    def _run(self, batch):
+        started = time.perf_counter()
+        metrics.observe('service_batch_size', len(batch))
+        metrics.observe('service_queue_depth', self._queue.qsize())
+        keys = self.predictor.required_features
+        all_names = feature_names()
+
+        # Cached clips skip extraction; the rest share one batched STFT
+        pending = []
+        results = []
+        for y, sr, gender, submitted, future in batch:
+            metrics.observe('service_queue_seconds', started - submitted)
+            key = cached = None
+            if self.cache is not None:
+                key = self.cache.key(y, sr)
+                cached = self.cache.get(key)
+            if cached is not None and all(name in cached for name in keys):
+                results.append(({name: cached[name] for name in all_names if name in cached}, gender, future))
+            else:
+                pending.append((pad_signal(y, sr), sr, gender, future, key, cached))
+
+        precomputed = [{} for _ in pending]
+        nodes = required_nodes(keys)
+        if pending and 'stft' in nodes:
+            with metrics.stage('stft'):
+                spectra = numpy_features.stft_batch([item[0] for item in pending], N_FFT, HOP_LENGTH)
+            for values, S in zip(precomputed, spectra):
+                values['stft'] = np.abs(S)
+        if pending and 'f0' in nodes and (resolve_pitch_backend() or PITCH_BACKEND) == 'yin' \
+                and PITCH_RANGE == 'full':
+            # One YIN pass per sample rate; pyin decodes each clip on its own
+            with metrics.stage('f0'):
+                for sr in {item[1] for item in pending}:
+                    group = [i for i, item in enumerate(pending) if item[1] == sr]
+                    for i, f0 in zip(group, yin_batch([pending[i][0] for i in group], sr)):
+                        precomputed[i]['f0'] = f0
+
+        for (y, sr, gender, future, key, cached), values in zip(pending, precomputed):
+            try:
+                with metrics.stage('extract'):
+                    features = extract_features_from_audio(y, sr, keys=keys, precomputed=values)
+            except Exception as e:
+                self._fail([future], e)
+                continue
+            if key is not None:
+                self.cache.put(key, dict(cached or {}, **features))
+            results.append((features, gender, future))
+
+        if results:
+            try:
+                with metrics.stage('predict'):
+                    matrix = features_to_matrix([item[0] for item in results], dtype=np.float64)
+                    prediction = self.predictor.predict_batch(matrix, [item[1] for item in results])
+            except Exception as e:
+                self._fail([item[2] for item in results], e)
+            else:
+                for i, (features, _, future) in enumerate(results):
+                    future.set_result((features, _select(prediction, i)))
+
+        with self._lock:
+            self.batches += 1
+            self.clips += len(batch)
+
+    def _fail(self, futures, error):
+        with self._lock:
+            self.failed += len(futures)
+        for future in futures:
+            future.set_exception(error)
+
+def _select(prediction, i):
+    """Row ``i`` of a predict_batch result, keeping length-1 arrays"""
+    return {name: _select(value, i) if isinstance(value, dict) else value[i:i + 1]
+            for name, value in prediction.items()}
+
+class ServiceClient:
+    """
+    Client of a service process, with the ``predict``/``stats`` interface
+    of MicroBatcher
+
+    Keeps a pool of open connections, one per concurrent request, and
+    reconnects once if the service was restarted.
+    """
+    def __init__(self, address=DEFAULT_SOCKET):
+        self.address = address
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def predict(self, y, sr, gender=None):
+        features, prediction = self._call({'op': 'predict', 'y': np.asarray(y, dtype=np.float32),
+                                           'sr': sr, 'gender': gender})
+        return features, prediction
+
+    def stats(self):
+        return self._call({'op': 'stats'})
+
+    def _call(self, request):
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        for attempt in range(2):
+            if connection is None:
+                # The key is re-read so a restarted service's new key is picked up
+                connection = Client(self.address, family='AF_UNIX', authkey=service_key(self.address))
+            try:
+                connection.send(request)
+                reply = connection.recv()
+                break
+            except (OSError, EOFError):
+                connection.close()
+                connection = None
+                if attempt:
+                    raise
+        with self._lock:
+            self._idle.append(connection)
+        if 'error' in reply:
+            raise (ServiceBusy if reply.get('busy') else RuntimeError)(reply['error'])
+        return reply['result']
+
+def connect(address=EXTRACTION_SERVICE, **options):
+    """
+    Extraction service for app.py: None (extract in-process without
+    batching), a MicroBatcher for 'inprocess', or a ServiceClient for a
+    socket path
+    """
+    if not address:
+        return None
+    if address == 'inprocess':
+        return MicroBatcher(**options)
+    return ServiceClient(address)
+
+def service_key(address, create=False):
+    """
+    Authentication key of the service at ``address``
+
+    EXTRACTION_SERVICE_KEY if set; otherwise the contents of
+    ``<address>.key``, which ``create`` replaces with a new random key
+    readable only by the current user.
+    """
+    if EXTRACTION_SERVICE_KEY:
+        return EXTRACTION_SERVICE_KEY.encode()
+    path = address + '.key'
+    if create:
+        if os.path.exists(path):
+            os.remove(path)
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(os.urandom(32).hex().encode())
+    with open(path, 'rb') as f:
+        return f.read().strip()
+
+def _handle(connection, batcher):
+    with connection:
+        while True:
+            try:
+                request = connection.recv()
+            except (OSError, EOFError):
+                return
+            try:
+                if request['op'] == 'stats':
+                    reply = {'result': dict(batcher.stats(), metrics=metrics.registry.render())}
+                else:
+                    reply = {'result': batcher.predict(request['y'], request['sr'], request.get('gender'))}
+            except Exception as e:
+                reply = {'error': str(e) or type(e).__name__, 'busy': isinstance(e, ServiceBusy)}
+            connection.send(reply)
+
+def serve(address, batcher):
+    """Accept web worker connections on a Unix socket, one thread each"""
+    if os.path.exists(address):
+        os.remove(address)
+    authkey = service_key(address, create=True)
+    with Listener(address, family='AF_UNIX', authkey=authkey) as listener:
+        # Only processes of the same user may submit clips
+        os.chmod(address, 0o600)
+        print(f"Extraction service listening on {address}")
+        while True:
+            try:
+                # Clients without the key are dropped before any message is read
+                connection = listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError):
+                continue
+            threading.Thread(target=_handle, args=(connection, batcher), daemon=True).start()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve micro-batched feature extraction over a Unix socket')
+    parser.add_argument('--socket', default=EXTRACTION_SERVICE if EXTRACTION_SERVICE not in (None, 'inprocess')
+                        else DEFAULT_SOCKET, help='Path of the Unix socket')
+    parser.add_argument('--batch-size', type=int, default=SERVICE_BATCH_SIZE, help='Largest micro-batch')
+    parser.add_argument('--wait', type=float, default=SERVICE_BATCH_WAIT,
+                        help='Seconds a batch waits for more clips')
+    parser.add_argument('--queue-size', type=int, default=SERVICE_QUEUE_SIZE, help='Clips allowed to wait')
+    parser.add_argument('--no-warmup', action='store_true', help='Skip the warm-up prediction')
+    args = parser.parse_args()
+
+    from feature_cache import FeatureCache
+    from synthetic import synthetic_voice
+
+    batcher = MicroBatcher(cache=FeatureCache(), batch_size=args.batch_size, wait=args.wait,
+                           max_queue=args.queue_size)
+    if not args.no_warmup:
+        start = time.perf_counter()
+        batcher.predict(synthetic_voice(duration=1.0), 22050)
+        print(f"Warmed up in {time.perf_counter() - start:.1f}s")
+    serve(args.socket, batcher)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
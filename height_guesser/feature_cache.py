@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from feature_extractor import (extract_features_from_audio, feature_names, resolve_backend,
+                               resolve_pitch_backend, source_node)
+import pitch
+
+# Entries kept in the in-process LRU tier, and the optional directory of the
+# on-disk tier (shared by every worker pointing at it)
+FEATURE_CACHE_SIZE = int(os.environ.get('FEATURE_CACHE_SIZE', 256))
+FEATURE_CACHE_DIR = os.environ.get('FEATURE_CACHE_DIR')
+
+class FeatureCache:
+    """
+    Content-addressed cache of extracted features
+
+    Entries are keyed by a hash of the decoded signal, its sample rate and
+    the extraction parameters, so re-submitting the same recording (under
+    any file name) skips extraction. A bounded LRU dict sits in front of an
+    optional directory of JSON files that several processes can share.
+    """
+    def __init__(self, max_entries=FEATURE_CACHE_SIZE, directory=FEATURE_CACHE_DIR):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(y, sr, n_mfcc=13, n_mels=40, pitch_backend=None, pitch_range=None, feature_backend=None):
+        """Hash identifying a signal and the parameters it is analysed with"""
+        params = {
+            'sr': int(sr),
+            'n_mfcc': n_mfcc,
+            'n_mels': n_mels,
+            'feature_backend': resolve_backend(feature_backend),
+            'pitch_backend': resolve_pitch_backend(feature_backend, pitch_backend) or pitch.PITCH_BACKEND,
+            'pitch_range': pitch_range or pitch.PITCH_RANGE,
+        }
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        digest.update(np.ascontiguousarray(y, dtype=np.float32).tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Cached feature dict for a key, or None"""
+        return self._lookup(key)[0]
+
+    def put(self, key, features):
+        """Store a feature dict in both tiers"""
+        features = {name: float(value) for name, value in features.items()}
+        self._store_memory(key, features)
+        self._write_disk(key, features)
+
+    def extract(self, y, sr, keys=None, **params):
+        """
+        Features of a decoded signal, extracted only on a cache miss
+
+        Takes the arguments of ``extract_features_from_audio`` and returns
+        the same dict. A cached entry is used if it holds every requested
+        key; otherwise the features are extracted and merged into the entry.
+        """
+        key = self.key(y, sr, **params)
+        cached, from_disk = self._lookup(key)
+        all_names = feature_names(params.get('n_mfcc', 13))
+        names = all_names if keys is None else keys
+        if cached is not None and all(name in cached for name in names):
+            self._count('disk_hits' if from_disk else 'hits')
+            # Same keys, in the same order, as an extraction would return
+            nodes = {source_node(name) for name in names}
+            return {name: cached[name] for name in all_names if source_node(name) in nodes}
+
+        self._count('misses')
+        features = extract_features_from_audio(y, sr, keys=keys, **params)
+        self.put(key, dict(cached or {}, **features))
+        return features
+
+    def stats(self):
+        """
+        Counters and the current memory tier size
+
+        'hits' were served from memory, 'disk_hits' from the disk tier and
+        'misses' ran an extraction; 'evictions' counts entries dropped from
+        the memory tier.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'directory': self.directory,
+            }
+
+    def clear(self):
+        """Drop the memory tier (the disk tier is left untouched)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _lookup(self, key):
+        """Cached entry for a key and whether it came from the disk tier"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key], False
+        features = self._read_disk(key)
+        if features is not None:
+            self._store_memory(key, features)
+        return features, features is not None
+
+    def _store_memory(self, key, features):
+        with self._lock:
+            self._entries[key] = features
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                features = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return features
+
+    def _write_disk(self, key, features):
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file and rename so concurrent readers in
+            # other workers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(features, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk tier is best effort; the memory tier still holds the entry
+            pass
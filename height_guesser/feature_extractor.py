@@ -1,14 +1,304 @@
 import numpy as np
 import os
+import logging
 import warnings
+import importlib.util
 
-# Handle librosa import for deployment environments
-try:
-    import librosa
-except ImportError:
-    warnings.warn("Librosa not available - feature extraction will be limited")
+import numpy_features
+from audio_io import apply_profile
+from metrics import stage
+from pitch import estimate_f0, f0_statistics
+from vad import trim_silence
 
-def extract_features(audio_path, n_mfcc=13, n_mels=40):
+logger = logging.getLogger(__name__)
+
+# librosa (and through it numba and scipy) is imported on first use by
+# load_librosa, so importing this module stays cheap at startup
+librosa = None
+
+def load_librosa():
+    """
+    Import librosa on first use and return it, or None if it is unavailable
+    
+    Handles deployment environments without librosa: the warning is issued
+    once and later calls return None straight away.
+    """
+    global librosa
+    if librosa is None:
+        try:
+            import librosa as module
+        except ImportError:
+            warnings.warn("Librosa not available - using the NumPy feature backend")
+            module = False
+        librosa = module
+    return librosa or None
+
+# Extraction backends. 'librosa' is the reference implementation; 'numpy'
+# (numpy_features.py) needs only NumPy and soundfile, imports far faster and
+# tracks F0 with YIN. 'auto' picks librosa when it is installed.
+FEATURE_BACKENDS = ('auto', 'librosa', 'numpy')
+FEATURE_BACKEND = os.environ.get('FEATURE_BACKEND', 'auto')
+
+def resolve_backend(backend=None):
+    """
+    Concrete extraction backend ('librosa' or 'numpy') for a requested one
+
+    'auto' checks whether librosa is installed without importing it.
+    """
+    backend = backend or FEATURE_BACKEND
+    if backend not in FEATURE_BACKENDS:
+        raise ValueError(f"Unknown feature backend '{backend}'. Choose one of: {', '.join(FEATURE_BACKENDS)}")
+    if backend == 'auto':
+        available = librosa if librosa is not None else importlib.util.find_spec('librosa') is not None
+        backend = 'librosa' if available else 'numpy'
+    return backend
+
+def resolve_pitch_backend(feature_backend=None, pitch_backend=None):
+    """
+    F0 tracker used with a feature backend
+
+    An explicit ``pitch_backend`` always wins; otherwise the NumPy backend
+    uses 'yin' (pyin needs librosa) and librosa uses pitch.PITCH_BACKEND.
+    """
+    if pitch_backend:
+        return pitch_backend
+    return 'yin' if resolve_backend(feature_backend) == 'numpy' else None
+
+# STFT parameters shared by all spectral features (librosa's defaults)
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# Documented agreement with the per-feature librosa calls this module used
+# before the shared STFT (relative tolerance on every statistic)
+SPECTRAL_RTOL = 1e-4
+
+# Per-frame feature nodes in the order their statistics appear in the
+# full feature dict
+STATISTIC_NODES = [
+    'f0', 'mfcc', 'mel_db',
+    'spectral_centroid', 'spectral_bandwidth', 'spectral_rolloff',
+    'zcr', 'rms',
+]
+
+# Feature key prefix -> node whose frames the statistic summarizes
+FEATURE_SOURCES = {
+    'f0': 'f0',
+    'mel': 'mel_db',
+    'spectral_centroid': 'spectral_centroid',
+    'spectral_bandwidth': 'spectral_bandwidth',
+    'spectral_rolloff': 'spectral_rolloff',
+    'zcr': 'zcr',
+    'rms': 'rms',
+}
+
+# Graph nodes of each concrete backend
+_NODES = {'librosa': {}, 'numpy': {}}
+
+def _node(name, *dependencies, backends=('librosa', 'numpy')):
+    """Register a feature graph node computed from the named dependencies"""
+    def register(func):
+        for backend in backends:
+            _NODES[backend][name] = (dependencies, func)
+        return func
+    return register
+
+@_node('f0', 'y')
+def _f0(graph, y):
+    # Fundamental frequency (F0) using pitch tracking
+    pitch_backend = resolve_pitch_backend(graph.backend, graph.pitch_backend)
+    return estimate_f0(y, graph.sr, backend=pitch_backend, pitch_range=graph.pitch_range)
+
+# Shared spectrogram: every spectral and cepstral statistic is derived from
+# this single STFT instead of re-transforming the signal once per librosa
+# feature call. Compared to calling each librosa feature on ``y`` directly the
+# statistics agree to within SPECTRAL_RTOL (relative).
+@_node('stft', 'y', backends=('librosa',))
+def _stft(graph, y):
+    return np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+
+@_node('power', 'stft')
+def _power(graph, S):
+    return S ** 2
+
+@_node('mfcc', 'power', backends=('librosa',))
+def _mfcc(graph, power):
+    # Mel-frequency cepstral coefficients from librosa's default 128-band mel
+    mel = librosa.feature.melspectrogram(S=power, sr=graph.sr)
+    return librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=graph.n_mfcc)
+
+@_node('mel_db', 'power', backends=('librosa',))
+def _mel_db(graph, power):
+    mel_spec = librosa.feature.melspectrogram(S=power, sr=graph.sr, n_mels=graph.n_mels)
+    return librosa.power_to_db(mel_spec, ref=np.max)
+
+@_node('spectral_centroid', 'stft', backends=('librosa',))
+def _spectral_centroid(graph, S):
+    return librosa.feature.spectral_centroid(S=S, sr=graph.sr)
+
+@_node('spectral_bandwidth', 'stft', 'spectral_centroid', backends=('librosa',))
+def _spectral_bandwidth(graph, S, centroid):
+    return librosa.feature.spectral_bandwidth(S=S, sr=graph.sr, centroid=centroid)
+
+@_node('spectral_rolloff', 'stft', backends=('librosa',))
+def _spectral_rolloff(graph, S):
+    return librosa.feature.spectral_rolloff(S=S, sr=graph.sr)
+
+@_node('zcr', 'y', backends=('librosa',))
+def _zcr(graph, y):
+    # Zero crossing rate (time domain, no transform needed)
+    return librosa.feature.zero_crossing_rate(y)
+
+@_node('rms', 'y', backends=('librosa',))
+def _rms(graph, y):
+    # Amplitude envelope (RMS energy) of the raw frames: taken from the
+    # windowed STFT its frame-to-frame spread differs, so rms_std would drift
+    return librosa.feature.rms(y=y, frame_length=N_FFT, hop_length=HOP_LENGTH)
+
+# The same nodes without librosa (see numpy_features.py); 'power' is shared
+@_node('stft', 'y', backends=('numpy',))
+def _numpy_stft(graph, y):
+    return np.abs(numpy_features.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+
+@_node('mfcc', 'power', backends=('numpy',))
+def _numpy_mfcc(graph, power):
+    mel = numpy_features.melspectrogram(power, graph.sr, n_fft=N_FFT)
+    return numpy_features.mfcc(numpy_features.power_to_db(mel), n_mfcc=graph.n_mfcc)
+
+@_node('mel_db', 'power', backends=('numpy',))
+def _numpy_mel_db(graph, power):
+    mel_spec = numpy_features.melspectrogram(power, graph.sr, n_fft=N_FFT, n_mels=graph.n_mels)
+    return numpy_features.power_to_db(mel_spec, ref=np.max)
+
+@_node('spectral_centroid', 'stft', backends=('numpy',))
+def _numpy_spectral_centroid(graph, S):
+    return numpy_features.spectral_centroid(S, graph.sr, n_fft=N_FFT)
+
+@_node('spectral_bandwidth', 'stft', 'spectral_centroid', backends=('numpy',))
+def _numpy_spectral_bandwidth(graph, S, centroid):
+    return numpy_features.spectral_bandwidth(S, graph.sr, centroid, n_fft=N_FFT)
+
+@_node('spectral_rolloff', 'stft', backends=('numpy',))
+def _numpy_spectral_rolloff(graph, S):
+    return numpy_features.spectral_rolloff(S, graph.sr, n_fft=N_FFT)
+
+@_node('zcr', 'y', backends=('numpy',))
+def _numpy_zcr(graph, y):
+    return numpy_features.zero_crossing_rate(y, frame_length=N_FFT, hop_length=HOP_LENGTH)
+
+@_node('rms', 'y', backends=('numpy',))
+def _numpy_rms(graph, y):
+    return numpy_features.rms(y, frame_length=N_FFT, hop_length=HOP_LENGTH)
+
+def source_node(key):
+    """
+    Name of the graph node a feature key is computed from
+    """
+    prefix = key.rsplit('_', 1)[0]
+    if prefix.startswith('mfcc'):
+        return 'mfcc'
+    if prefix not in FEATURE_SOURCES:
+        raise KeyError(f"Unknown feature '{key}'")
+    return FEATURE_SOURCES[prefix]
+
+def required_nodes(keys=None, feature_backend=None):
+    """
+    Names of every graph node needed for the requested feature keys
+
+    Includes intermediate nodes such as 'stft', so callers can tell which
+    shared inputs are worth computing up front.
+    """
+    nodes = _NODES[resolve_backend(feature_backend)]
+    pending = list(STATISTIC_NODES) if keys is None else [source_node(key) for key in keys]
+    needed = set()
+    while pending:
+        name = pending.pop()
+        if name not in needed and name in nodes:
+            needed.add(name)
+            pending.extend(nodes[name][0])
+    return needed
+
+def feature_names(n_mfcc=13):
+    """
+    Keys of the full feature dict, in the order ``extract_features`` returns them
+    """
+    names = ['f0_mean', 'f0_std', 'f0_min', 'f0_max']
+    names += [f'mfcc{i+1}_{stat}' for i in range(n_mfcc) for stat in ('mean', 'std')]
+    for name in STATISTIC_NODES[2:]:
+        prefix = 'mel' if name == 'mel_db' else name
+        names += [f'{prefix}_mean', f'{prefix}_std']
+    return names
+
+class FeatureGraph:
+    """
+    Lazily evaluated graph of audio features for one signal
+
+    Each node is computed at most once, on first request, after its declared
+    dependencies, so asking for a subset of features only runs the nodes
+    (and shared inputs such as the STFT) that subset needs. The nodes are
+    those of the resolved ``feature_backend``. Node values computed elsewhere
+    (e.g. an STFT batched over several signals) can be passed as
+    ``precomputed``.
+    """
+    def __init__(self, y, sr, n_mfcc=13, n_mels=40, pitch_backend=None, pitch_range=None,
+                 feature_backend=None, precomputed=None):
+        self.backend = resolve_backend(feature_backend)
+        if self.backend == 'librosa' and load_librosa() is None:
+            self.backend = 'numpy'
+        self._nodes = _NODES[self.backend]
+        self.sr = sr
+        self.n_mfcc = n_mfcc
+        self.n_mels = n_mels
+        self.pitch_backend = pitch_backend
+        self.pitch_range = pitch_range
+        self._values = dict(precomputed or {}, y=y)
+
+    def get(self, name):
+        """Value of a node, computing it and its dependencies if needed"""
+        if name not in self._values:
+            dependencies, func = self._nodes[name]
+            inputs = [self.get(dep) for dep in dependencies]
+            # Timed after its inputs, so each stage only counts its own work
+            with stage(name):
+                self._values[name] = func(self, *inputs)
+        return self._values[name]
+
+    def computed(self):
+        """Names of the nodes evaluated so far"""
+        return list(self._values)
+
+    def statistics(self, name):
+        """Summary statistics of a per-frame node, keyed as in the feature dict"""
+        values = self.get(name)
+        if name == 'f0':
+            return f0_statistics(values)
+        if name == 'mfcc':
+            features = {}
+            for i in range(self.n_mfcc):
+                features[f'mfcc{i+1}_mean'] = np.mean(values[i])
+                features[f'mfcc{i+1}_std'] = np.std(values[i])
+            return features
+        prefix = 'mel' if name == 'mel_db' else name
+        return {f'{prefix}_mean': np.mean(values), f'{prefix}_std': np.std(values)}
+
+    def features(self, keys=None):
+        """
+        Feature dict for the requested keys (all features if ``keys`` is None)
+
+        Statistics are produced per node, so requesting one key of a node
+        (e.g. 'f0_mean') returns every statistic of that node.
+        """
+        if keys is None:
+            names = STATISTIC_NODES
+        else:
+            needed = {source_node(key) for key in keys}
+            names = [name for name in STATISTIC_NODES if name in needed]
+        features = {}
+        for name in names:
+            features.update(self.statistics(name))
+        return features
+
+def extract_features(audio_path, n_mfcc=13, n_mels=40, pitch_backend=None, pitch_range=None,
+                     keys=None, analysis_profile=None, cache=None, vad=None, feature_backend=None):
     """
     Extract audio features from an audio file
     
@@ -20,108 +310,183 @@ def extract_features(audio_path, n_mfcc=13, n_mels=40):
         Number of MFCC coefficients to extract
     n_mels : int
         Number of Mel bands to generate
+    pitch_backend : str, optional
+        F0 tracker to use ('pyin' or 'yin'); defaults to pitch.PITCH_BACKEND
+        ('yin' with the NumPy feature backend)
+    pitch_range : str, optional
+        Pitch search mode ('full' or 'speech'); defaults to pitch.PITCH_RANGE
+    keys : list of str, optional
+        Feature keys the caller needs; only the graph nodes they depend on
+        are computed. All features are extracted if omitted.
+    analysis_profile : str, optional
+        Sample rate and duration limits applied before analysis (a key of
+        audio_io.ANALYSIS_PROFILES); defaults to audio_io.ANALYSIS_PROFILE
+    cache : feature_cache.FeatureCache, optional
+        Cache consulted (and filled) with the decoded signal's features
+    vad : bool, optional
+        Drop the silence around and between speech before analysis;
+        defaults to vad.VAD_ENABLED
+    feature_backend : str, optional
+        Extraction backend ('auto', 'librosa' or 'numpy'); defaults to
+        FEATURE_BACKEND
         
     Returns:
     --------
     features : dict
         Dictionary containing extracted features
     """
-    # Check if librosa is available
-    if 'librosa' not in globals():
-        # Provide a default set of features if librosa not available
-        return {
-            'f0_mean': 120, # Default value, will be auto-detected as male
-            'f0_std': 5,
-            'f0_min': 110,
-            'f0_max': 130,
-            'mfcc1_mean': 0.1,
-            'mfcc1_std': 0.05,
-        }
-    
-    # Load audio file with librosa
-    y, sr = librosa.load(audio_path, sr=None)
+    backend = resolve_backend(feature_backend)
+    with stage('load'):
+        if backend == 'librosa' and load_librosa() is not None:
+            y, sr = librosa.load(audio_path, sr=None)
+        else:
+            y, sr = numpy_features.load(audio_path)
+    y, sr, _ = apply_profile(y, sr, analysis_profile, feature_backend=backend)
+    with stage('vad'):
+        y, _ = trim_silence(y, sr, vad)
     
-    # Make sure audio is at least 1 second for reliable feature extraction
+    extract = cache.extract if cache is not None else extract_features_from_audio
+    return extract(y, sr, n_mfcc=n_mfcc, n_mels=n_mels,
+                   pitch_backend=pitch_backend, pitch_range=pitch_range,
+                   keys=keys, feature_backend=backend)
+
+def pad_signal(y, sr):
+    """Zero-pad a signal to at least one second for reliable feature extraction"""
     if len(y) < sr:
         y = np.pad(y, (0, sr - len(y)), 'constant')
+    return y
+
+def extract_features_from_audio(y, sr, n_mfcc=13, n_mels=40, pitch_backend=None, pitch_range=None,
+                                keys=None, feature_backend=None, precomputed=None):
+    """
+    Extract audio features from a decoded signal
+
+    Takes the same parameters as ``extract_features`` with the signal ``y``
+    and its sample rate ``sr`` in place of a file path, plus optional
+    ``precomputed`` graph node values of the padded signal.
+    """
+    y = pad_signal(y, sr)
     
-    # Extract features
-    features = {}
-    
-    # Fundamental frequency (F0) using pitch tracking
-    f0, voiced_flag, voiced_probs = librosa.pyin(y, 
-                                               fmin=librosa.note_to_hz('C2'), 
-                                               fmax=librosa.note_to_hz('C7'),
-                                               sr=sr)
-    f0 = f0[~np.isnan(f0)]  # Remove NaN values
-    if len(f0) > 0:
-        features['f0_mean'] = np.mean(f0)
-        features['f0_std'] = np.std(f0)
-        features['f0_min'] = np.min(f0)
-        features['f0_max'] = np.max(f0)
-    else:
-        features['f0_mean'] = 0
-        features['f0_std'] = 0
-        features['f0_min'] = 0
-        features['f0_max'] = 0
-    
-    # Extract MFCCs (Mel-frequency cepstral coefficients)
-    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc)
-    for i in range(n_mfcc):
-        features[f'mfcc{i+1}_mean'] = np.mean(mfccs[i])
-        features[f'mfcc{i+1}_std'] = np.std(mfccs[i])
-    
-    # Mel spectrogram features
-    mel_spec = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=n_mels)
-    mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
-    features['mel_mean'] = np.mean(mel_spec_db)
-    features['mel_std'] = np.std(mel_spec_db)
-    
-    # Spectral features
-    spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-    features['spectral_centroid_mean'] = np.mean(spectral_centroid)
-    features['spectral_centroid_std'] = np.std(spectral_centroid)
-    
-    spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)[0]
-    features['spectral_bandwidth_mean'] = np.mean(spectral_bandwidth)
-    features['spectral_bandwidth_std'] = np.std(spectral_bandwidth)
-    
-    spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
-    features['spectral_rolloff_mean'] = np.mean(spectral_rolloff)
-    features['spectral_rolloff_std'] = np.std(spectral_rolloff)
-    
-    # Zero crossing rate
-    zcr = librosa.feature.zero_crossing_rate(y)[0]
-    features['zcr_mean'] = np.mean(zcr)
-    features['zcr_std'] = np.std(zcr)
-    
-    # Amplitude envelope (RMS energy)
-    rms = librosa.feature.rms(y=y)[0]
-    features['rms_mean'] = np.mean(rms)
-    features['rms_std'] = np.std(rms)
-    
-    return features
+    graph = FeatureGraph(y, sr, n_mfcc=n_mfcc, n_mels=n_mels,
+                         pitch_backend=pitch_backend, pitch_range=pitch_range,
+                         feature_backend=feature_backend, precomputed=precomputed)
+    return graph.features(keys)
+
+# Feature order of the model input vector
+VECTOR_FEATURES = [
+    'f0_mean', 'f0_std', 'f0_min', 'f0_max',
+    'spectral_centroid_mean', 'spectral_centroid_std',
+    'spectral_bandwidth_mean', 'spectral_bandwidth_std',
+    'spectral_rolloff_mean', 'spectral_rolloff_std',
+    'zcr_mean', 'zcr_std',
+    'rms_mean', 'rms_std',
+    'mel_mean', 'mel_std'
+] + [f'mfcc{i+1}_{stat}' for i in range(13) for stat in ('mean', 'std')]
 
 def features_to_vector(features):
     """
     Convert features dictionary to a vector for model input
     """
-    # Define the expected features in a specific order
-    expected_features = [
-        'f0_mean', 'f0_std', 'f0_min', 'f0_max',
-        'spectral_centroid_mean', 'spectral_centroid_std',
-        'spectral_bandwidth_mean', 'spectral_bandwidth_std',
-        'spectral_rolloff_mean', 'spectral_rolloff_std',
-        'zcr_mean', 'zcr_std',
-        'rms_mean', 'rms_std',
-        'mel_mean', 'mel_std'
-    ]
+    # Create vector
+    vector = np.array([features.get(feature, 0) for feature in VECTOR_FEATURES])
+    return vector
+
+def features_to_matrix(features, columns=VECTOR_FEATURES, dtype=np.float32):
+    """
+    Stack feature dicts into an (N, len(columns)) matrix
+
+    Rows match ``features_to_vector`` (missing features are 0), filled
+    straight into one array instead of building a list per sample.
+    """
+    n_columns = len(columns)
+    values = (sample.get(name, 0) for sample in features for name in columns)
+    matrix = np.fromiter(values, dtype=dtype, count=len(features) * n_columns)
+    return matrix.reshape(len(features), n_columns)
+
+# Extraction options for the current batch worker process, set once by
+# _init_batch_worker so they are not re-sent with every task
+_batch_options = {}
+
+# Options of extract_features that the in-memory warm-up also accepts
+# (analysis_profile, cache and vad only apply to files)
+WARMUP_OPTIONS = ('n_mfcc', 'n_mels', 'pitch_backend', 'pitch_range', 'keys', 'feature_backend')
+
+def _init_batch_worker(options):
+    """
+    Process pool initializer: store the options and warm up the pipeline
+
+    Running one extraction on a short synthetic clip triggers librosa's lazy
+    imports and numba JIT compilation once per worker instead of on the
+    first real file.
+    """
+    from synthetic import synthetic_voice
+    _batch_options.update(options)
+    try:
+        extract_features_from_audio(synthetic_voice(duration=0.5), 22050,
+                                    **{name: value for name, value in options.items() if name in WARMUP_OPTIONS})
+    except (ImportError, OSError, ValueError, RuntimeError):
+        # The worker still runs; its first file pays the warm-up instead
+        logger.warning("Batch worker warm-up failed", exc_info=True)
+
+def _extract_batch_item(path):
+    try:
+        return features_to_vector(extract_features(path, **_batch_options)), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def extract_features_batch(paths, workers=None, chunksize=None, **options):
+    """
+    Extract feature vectors for many audio files in a process pool
+    
+    Parameters:
+    -----------
+    paths : list of str
+        Paths to the audio files
+    workers : int, optional
+        Number of worker processes (defaults to the number of CPUs). With
+        one worker the files are processed in the calling process.
+    chunksize : int, optional
+        Files handed to a worker per task; defaults to spreading the paths
+        over about four chunks per worker
+    **options
+        Extraction options passed to ``extract_features`` (n_mfcc, n_mels,
+        pitch_backend, pitch_range, analysis_profile, feature_backend)
+        
+    Returns:
+    --------
+    matrix : numpy.ndarray
+        (len(paths), len(VECTOR_FEATURES)) array in ``features_to_vector``
+        column order; rows of files that failed are NaN
+    errors : list of dict
+        One record per failed file with its 'index', 'path' and 'error'
+    """
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    matrix = np.full((len(paths), len(VECTOR_FEATURES)), np.nan)
+    errors = []
+    executor = None
     
-    # Add MFCC features
-    for i in range(13):
-        expected_features.append(f'mfcc{i+1}_mean')
-        expected_features.append(f'mfcc{i+1}_std')
+    if workers == 1 or len(paths) <= 1:
+        _batch_options.clear()
+        _batch_options.update(options)
+        results = map(_extract_batch_item, paths)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        if chunksize is None:
+            chunksize = max(1, len(paths) // (workers * 4))
+        executor = ProcessPoolExecutor(max_workers=workers,
+                                       initializer=_init_batch_worker,
+                                       initargs=(options,))
+        results = executor.map(_extract_batch_item, paths, chunksize=chunksize)
     
-    # Create vector
-    vector = np.array([features.get(feature, 0) for feature in expected_features])
-    return vector 
\ No newline at end of file
+    try:
+        for index, (vector, error) in enumerate(results):
+            if error is None:
+                matrix[index] = vector
+            else:
+                errors.append({'index': index, 'path': paths[index], 'error': error})
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    return matrix, errors
@@ -0,0 +1,246 @@
+"""
+Columnar, memory-mapped store of feature vectors for large corpora
+
+Layout of a store directory:
+
+    schema.json           column names (``features_to_vector`` order), dtype, shard size
+    shards.json           committed row count of every shard
+    shard-00000.npy ...   (n_columns, shard_size) float32 arrays, one column per row
+    index.jsonl           one line per row: row, path, content hash, duration, labels
+
+Shards are preallocated at full size and filled in place, so appending never
+rewrites existing rows: new rows go into the free tail of the last shard,
+then into new shards. Opening a store reads only the two small JSON files
+and memory-maps the shards, so it is instant whatever the number of clips.
+The metadata index is parsed only when it is used. Rows become visible when
+shards.json is replaced, so an interrupted append leaves the store as it
+was before.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+
+from feature_extractor import VECTOR_FEATURES, features_to_matrix
+
+# Rows per shard file (42 float32 columns: about 11 MB per shard)
+SHARD_SIZE = 65536
+
+def file_hash(path):
+    """Content hash of a file, for spotting the same clip under another name"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class FeatureStore:
+    """
+    Append-only columnar feature store
+
+    Parameters:
+    -----------
+    directory : str
+        Store directory, created if missing
+    columns : list of str, optional
+        Feature names of a new store (defaults to VECTOR_FEATURES); an
+        existing store keeps its own schema
+    shard_size : int
+        Rows per shard of a new store
+    """
+    def __init__(self, directory, columns=None, shard_size=SHARD_SIZE):
+        self.directory = directory
+        schema_path = os.path.join(directory, 'schema.json')
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                schema = json.load(f)
+        else:
+            schema = {'columns': list(columns or VECTOR_FEATURES), 'dtype': 'float32',
+                      'shard_size': shard_size}
+            os.makedirs(directory, exist_ok=True)
+            self._write_json('schema.json', schema)
+        self.columns = schema['columns']
+        self.dtype = np.dtype(schema['dtype'])
+        self.shard_size = schema['shard_size']
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+
+        shards_path = os.path.join(directory, 'shards.json')
+        if os.path.exists(shards_path):
+            with open(shards_path) as f:
+                self._counts = json.load(f)['counts']
+        else:
+            self._counts = []
+        self._shards = [self._open_shard(i) for i in range(len(self._counts))]
+        self._index = None
+        self._hashes = None
+
+    def __len__(self):
+        return sum(self._counts)
+
+    def _shard_path(self, i):
+        return os.path.join(self.directory, f'shard-{i:05d}.npy')
+
+    def _open_shard(self, i, create=False):
+        path = self._shard_path(i)
+        if create and not os.path.exists(path):
+            # Allocated sparse on most filesystems; untouched rows take no space
+            return np.lib.format.open_memmap(path, mode='w+', dtype=self.dtype,
+                                             shape=(len(self.columns), self.shard_size))
+        return np.load(path, mmap_mode='r+' if create else 'r')
+
+    def _write_json(self, name, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    def append(self, features, paths, hashes=None, durations=None, labels=None, skip_existing=True):
+        """
+        Add rows to the store
+
+        Parameters:
+        -----------
+        features : numpy.ndarray or list of dict
+            (N, n_columns) matrix in schema order, or feature dicts
+        paths : list of str
+            Source file of each row
+        hashes : list of str, optional
+            Content hash of each row's file (computed with ``file_hash``
+            if omitted)
+        durations : list of float, optional
+            Audio duration of each row in seconds
+        labels : list of dict, optional
+            Labels of each row, e.g. {'height': 172.0, 'gender': 'female'}
+        skip_existing : bool
+            Skip rows whose content hash is already stored
+
+        Returns:
+        --------
+        rows : list of int
+            Row number of each added row (skipped rows are left out)
+        """
+        if len(features) and isinstance(features[0], dict):
+            features = features_to_matrix(features, self.columns)
+        features = np.asarray(features, dtype=self.dtype).reshape(-1, len(self.columns))
+        paths = list(paths)
+        hashes = list(hashes) if hashes is not None else [file_hash(path) for path in paths]
+        durations = list(durations) if durations is not None else [None] * len(paths)
+        labels = list(labels) if labels is not None else [{}] * len(paths)
+
+        keep = list(range(len(paths)))
+        if skip_existing:
+            known = self.hashes()
+            keep = []
+            for i, digest in enumerate(hashes):
+                if digest not in known:
+                    known.add(digest)
+                    keep.append(i)
+        if not keep:
+            return []
+
+        rows = []
+        entries = []
+        position = 0
+        while position < len(keep):
+            if not self._counts or self._counts[-1] == self.shard_size:
+                self._counts.append(0)
+                self._shards.append(self._open_shard(len(self._counts) - 1, create=True))
+            shard = len(self._counts) - 1
+            if self._shards[shard].mode not in ('r+', 'w+'):
+                self._shards[shard] = self._open_shard(shard, create=True)
+            start = self._counts[shard]
+            take = keep[position:position + self.shard_size - start]
+            self._shards[shard][:, start:start + len(take)] = features[take].T
+            self._shards[shard].flush()
+            for offset, i in enumerate(take):
+                row = shard * self.shard_size + start + offset
+                rows.append(row)
+                entries.append({'row': row, 'path': paths[i], 'hash': hashes[i],
+                                'duration': durations[i], 'labels': labels[i]})
+            self._counts[shard] += len(take)
+            position += len(take)
+
+        with open(os.path.join(self.directory, 'index.jsonl'), 'a') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+        # Commit: the new rows are visible once the counts are replaced
+        self._write_json('shards.json', {'counts': self._counts})
+        if self._index is not None:
+            self._index.extend(entries)
+        return rows
+
+    def read(self, start=0, stop=None, columns=None):
+        """
+        (rows, columns) matrix of a row range
+
+        Rows inside a single shard with a contiguous run of columns (or all
+        of them) are a zero-copy view of the memory-mapped file; ranges
+        spanning shards are concatenated.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        column_slice = self._column_slice(columns)
+        parts = []
+        for shard, count in enumerate(self._counts):
+            offset = shard * self.shard_size
+            lo, hi = max(start - offset, 0), min(stop - offset, count)
+            if lo < hi:
+                parts.append(self._shards[shard][column_slice, lo:hi].T)
+        if not parts:
+            return np.empty((0, self._n_columns(column_slice)), dtype=self.dtype)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def column(self, name):
+        """All values of one feature (a zero-copy view within one shard)"""
+        return self.read(columns=[name])[:, 0]
+
+    def iter_shards(self, columns=None):
+        """Yield (first row, zero-copy (rows, columns) view) for every shard"""
+        column_slice = self._column_slice(columns)
+        for shard, count in enumerate(self._counts):
+            yield shard * self.shard_size, self._shards[shard][column_slice, :count].T
+
+    def index(self):
+        """Metadata of every committed row, in row order"""
+        if self._index is None:
+            entries = {}
+            path = os.path.join(self.directory, 'index.jsonl')
+            if os.path.exists(path):
+                with open(path) as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            # Partial line from an interrupted append
+                            continue
+                        entries[entry['row']] = entry
+            self._index = [entries[row] for row in sorted(entries) if self._committed(row)]
+        return self._index
+
+    def labels(self, name):
+        """One label of every row as an array (NaN where missing)"""
+        return np.array([entry['labels'].get(name, np.nan) for entry in self.index()], dtype=float)
+
+    def hashes(self):
+        """Content hashes of the stored rows"""
+        if self._hashes is None:
+            self._hashes = {entry['hash'] for entry in self.index()}
+        return self._hashes
+
+    def _committed(self, row):
+        shard, offset = divmod(row, self.shard_size)
+        return shard < len(self._counts) and offset < self._counts[shard]
+
+    def _column_slice(self, columns):
+        if columns is None:
+            return slice(None)
+        positions = [self._column_index[name] for name in columns]
+        if positions == list(range(positions[0], positions[0] + len(positions))):
+            return slice(positions[0], positions[0] + len(positions))
+        return positions
+
+    def _n_columns(self, column_slice):
+        if isinstance(column_slice, slice):
+            return len(range(*column_slice.indices(len(self.columns))))
+        return len(column_slice)
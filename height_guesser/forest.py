@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Array-backed random forest inference for HeightPredictor
+
+A scikit-learn forest is trained once and flattened into contiguous NumPy
+node arrays (feature, children, threshold, value) saved as .npy files next
+to a small JSON metadata file. Loading memory-maps the node arrays, so
+every gunicorn worker shares one copy through the page cache, and
+inference walks all trees for all samples with array indexing instead of
+sklearn's per-call overhead.
+
+Train and export from a CSV manifest (columns: path, height):
+
+    python forest.py manifest.csv --output models/forest
+
+or from the labelled rows of a feature store (see feature_store.py):
+
+    python forest.py --store features/ --output models/forest
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+# Node arrays of every tree, stored column-wise so each field is contiguous:
+# NODE_INTS rows are (feature, left, right) and NODE_FLOATS rows are
+# (threshold, value). Leaves have feature -1 and point to themselves, so
+# traversal can step all samples together until each has reached a leaf.
+FEATURE, LEFT, RIGHT = range(3)
+THRESHOLD, VALUE = range(2)
+
+class TreeEnsemble:
+    """
+    Flattened tree ensemble with vectorized inference
+
+    Parameters:
+    -----------
+    ints : numpy.ndarray
+        (3, n_nodes) int32 feature, left and right child of every node
+    floats : numpy.ndarray
+        (2, n_nodes) float64 threshold and leaf value of every node
+    roots : numpy.ndarray
+        Index of each tree's root node
+    depth : int
+        Depth of the deepest tree
+    feature_names : list of str, optional
+        Names of the input columns, in order
+    """
+    def __init__(self, ints, floats, roots, depth, feature_names=None):
+        self.ints = ints
+        self.floats = floats
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.depth = int(depth)
+        self.feature_names = feature_names
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return self.ints.shape[1]
+
+    @classmethod
+    def from_sklearn(cls, model, feature_names=None):
+        """Flatten a fitted sklearn RandomForestRegressor (or any tree ensemble)"""
+        sizes = [estimator.tree_.node_count for estimator in model.estimators_]
+        ints = np.zeros((3, sum(sizes)), dtype=np.int32)
+        floats = np.zeros((2, sum(sizes)), dtype=np.float64)
+        roots = np.cumsum([0] + sizes[:-1])
+        for root, estimator in zip(roots, model.estimators_):
+            tree = estimator.tree_
+            nodes = slice(root, root + tree.node_count)
+            leaf = tree.children_left < 0
+            own = root + np.arange(tree.node_count)
+            ints[FEATURE, nodes] = np.where(leaf, -1, tree.feature)
+            ints[LEFT, nodes] = np.where(leaf, own, root + tree.children_left)
+            ints[RIGHT, nodes] = np.where(leaf, own, root + tree.children_right)
+            floats[THRESHOLD, nodes] = np.where(leaf, 0.0, tree.threshold)
+            floats[VALUE, nodes] = tree.value[:, 0, 0]
+        depth = max(estimator.tree_.max_depth for estimator in model.estimators_)
+        return cls(ints, floats, roots, depth, feature_names)
+
+    def save(self, path):
+        """Write ``<path>.ints.npy``, ``<path>.floats.npy`` and ``<path>.json``"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.save(path + '.ints.npy', np.ascontiguousarray(self.ints))
+        np.save(path + '.floats.npy', np.ascontiguousarray(self.floats))
+        with open(path + '.json', 'w') as f:
+            json.dump({
+                'roots': self.roots.tolist(),
+                'depth': self.depth,
+                'feature_names': self.feature_names,
+            }, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load an exported ensemble, memory-mapping the node arrays by default"""
+        with open(path + '.json') as f:
+            meta = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        ints = np.load(path + '.ints.npy', mmap_mode=mmap_mode)
+        floats = np.load(path + '.floats.npy', mmap_mode=mmap_mode)
+        return cls(ints, floats, meta['roots'], meta['depth'], meta.get('feature_names'))
+
+    def predict_trees(self, X):
+        """
+        Output of every tree for every sample
+
+        Parameters:
+        -----------
+        X : numpy.ndarray
+            (N, F) matrix or a single length-F vector
+
+        Returns:
+        --------
+        outputs : numpy.ndarray
+            (N, n_trees) tree predictions
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        # sklearn compares float32 inputs against its thresholds
+        X = X.astype(np.float32).astype(np.float64)
+        feature = self.ints[FEATURE]
+        threshold = self.floats[THRESHOLD]
+
+        rows = np.arange(len(X))[:, None]
+        index = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+        for _ in range(self.depth):
+            node_feature = feature[index]
+            if (node_feature < 0).all():
+                break
+            go_right = X[rows, np.maximum(node_feature, 0)] > threshold[index]
+            index = self.ints[LEFT + go_right, index]
+        return self.floats[VALUE][index]
+
+    def predict(self, X):
+        """Mean tree output per sample"""
+        return self.predict_trees(X).mean(axis=1)
+
+    def predict_interval(self, X, coverage=0.9):
+        """
+        Prediction with a data-driven interval from the spread of the trees
+
+        Returns the mean prediction and the lower and upper percentiles of
+        the per-tree outputs enclosing ``coverage`` of them.
+        """
+        outputs = self.predict_trees(X)
+        tail = (1 - coverage) / 2 * 100
+        lower, upper = np.percentile(outputs, [tail, 100 - tail], axis=1)
+        return outputs.mean(axis=1), lower, upper
+
+def train_forest(X, heights, feature_names=None, n_estimators=100, random_state=42, **kwargs):
+    """
+    Fit a random forest on feature vectors and flatten it
+
+    Parameters:
+    -----------
+    X : numpy.ndarray
+        (N, F) matrix of ``features_to_vector`` rows
+    heights : numpy.ndarray
+        Height in centimeters of each sample
+    feature_names : list of str, optional
+        Column names stored with the model
+    n_estimators, random_state, **kwargs
+        Passed to sklearn's RandomForestRegressor
+
+    Returns:
+    --------
+    ensemble : TreeEnsemble
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, **kwargs)
+    model.fit(np.asarray(X, dtype=np.float64), np.asarray(heights, dtype=np.float64))
+    return TreeEnsemble.from_sklearn(model, feature_names)
+
+def main():
+    parser = argparse.ArgumentParser(description='Train and export the array-backed height model')
+    parser.add_argument('manifest', nargs='?', help='CSV file with path and height (cm) columns')
+    parser.add_argument('--store', help='Train on the labelled rows of a feature store instead')
+    parser.add_argument('--output', required=True, help='Output path prefix (writes .npy and .json)')
+    parser.add_argument('--workers', type=int, help='Feature extraction processes (default: all CPUs)')
+    parser.add_argument('--trees', type=int, default=100, help='Number of trees')
+    args = parser.parse_args()
+    if not args.manifest and not args.store:
+        parser.error('a manifest or --store is required')
+
+    # Add current directory to path to import local modules
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import csv
+    from feature_extractor import extract_features_batch, VECTOR_FEATURES
+
+    if args.store:
+        from feature_store import FeatureStore
+        store = FeatureStore(args.store)
+        if store.columns != VECTOR_FEATURES:
+            print(f"Error: {args.store} does not store the VECTOR_FEATURES columns")
+            return 1
+        X = store.read()
+        heights = store.labels('height')
+        valid = ~np.isnan(heights)
+        print(f"Loaded {len(store)} clips from {args.store}")
+    else:
+        with open(args.manifest, newline='') as f:
+            rows = list(csv.DictReader(f))
+        paths = [row['path'] for row in rows]
+        heights = np.array([float(row['height']) for row in rows])
+
+        print(f"Extracting features from {len(paths)} files...")
+        X, errors = extract_features_batch(paths, workers=args.workers)
+        for error in errors:
+            print(f"Skipping {error['path']}: {error['error']}")
+        valid = ~np.isnan(X).any(axis=1)
+
+    print(f"Training {args.trees} trees on {valid.sum()} samples...")
+    ensemble = train_forest(X[valid], heights[valid], feature_names=VECTOR_FEATURES,
+                            n_estimators=args.trees)
+    ensemble.save(args.output)
+    print(f"Model written to {args.output} ({ensemble.n_nodes} nodes, depth {ensemble.depth})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,181 @@
+import os
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
+
+# Path prefix of a forest exported by forest.py; without one the rule-based
+# predictor is used. PREDICTION_COVERAGE is the share of tree outputs the
+# trained model's range encloses.
+HEIGHT_MODEL = os.environ.get('HEIGHT_MODEL')
+PREDICTION_COVERAGE = float(os.environ.get('PREDICTION_COVERAGE', 0.9))
 
 class HeightPredictor:
-    def __init__(self):
+    # Feature keys the prediction reads; extraction can skip everything else
+    REQUIRED_FEATURES = ['f0_mean']
+    
+    def __init__(self, model_path=HEIGHT_MODEL):
         """
         Initialize the height predictor model
+        
+        Parameters:
+        -----------
+        model_path : str, optional
+            Path prefix of an exported forest (see forest.py), memory-mapped
+            so every worker process shares one copy
         """
-        # Create a simple random forest regressor
-        self.model = RandomForestRegressor(
-            n_estimators=100,
-            random_state=42
-        )
-        # Since we don't have real training data, we'll use a simple rule-based approach
-        # and pretend we have a trained model
+        # scikit-learn is only needed to train; inference runs on the
+        # exported node arrays, which keeps startup fast
+        self.model = None
+        # Without training data we fall back to a simple rule-based approach
         self.is_trained = False
+        if model_path:
+            from forest import TreeEnsemble
+            self.model = TreeEnsemble.load(model_path)
+            self.is_trained = True
+    
+    @property
+    def required_features(self):
+        """Feature keys this predictor reads (all model inputs once trained)"""
+        if self.is_trained:
+            return list(self.model.feature_names)
+        return self.REQUIRED_FEATURES
+    
+    def fit(self, X, heights, export_path=None, **kwargs):
+        """
+        Train the forest on ``features_to_vector`` rows and optionally export it
         
+        Parameters:
+        -----------
+        X : numpy.ndarray
+            (N, F) feature matrix in ``features_to_vector`` order
+        heights : numpy.ndarray
+            Height in centimeters of each sample
+        export_path : str, optional
+            Path prefix to save the node arrays to
+        **kwargs
+            Passed to ``forest.train_forest``
+        """
+        from forest import train_forest
+        from feature_extractor import VECTOR_FEATURES
+        self.model = train_forest(X, heights, feature_names=VECTOR_FEATURES, **kwargs)
+        self.is_trained = True
+        if export_path:
+            self.model.save(export_path)
+        return self
+        
+    # Rule parameters per gender: average, minimum and maximum height (cm),
+    # the F0 range (Hz) mapped onto heights, and the height span of that mapping
+    MALE = {'base': 177, 'min': 164, 'max': 190, 'low_f0': 85, 'high_f0': 155, 'span': 13}
+    FEMALE = {'base': 164, 'min': 152, 'max': 176, 'low_f0': 165, 'high_f0': 255, 'span': 12}
+    
+    def predict_batch(self, features, gender=None):
+        """
+        Predict heights, ranges and imperial conversions for many samples at once
+        
+        Parameters:
+        -----------
+        features : numpy.ndarray
+            Either an (N, F) feature matrix in ``features_to_vector`` order or
+            a length-N vector of f0_mean values
+        gender : str or array-like of str, optional
+            Gender per sample ('male' or 'female'); None entries (or None for
+            all) are detected from F0
+            
+        A trained model predicts from the full matrix, with the range
+        spanning PREDICTION_COVERAGE of the per-tree outputs; an f0 vector
+        always uses the rules.
+            
+        Returns:
+        --------
+        result : dict of numpy.ndarray
+            'height', 'confidence', 'lower_bound', 'upper_bound' and
+            'gender' per sample, plus 'imperial' holding 'feet', 'inches' and
+            'total_inches' arrays for the height and both bounds
+        """
+        features = np.asarray(features, dtype=float)
+        f0_mean = features[:, 0] if features.ndim == 2 else features
+        
+        # Determine gender based on f0 if not provided
+        # Average male F0: 85-155 Hz, female F0: 165-255 Hz
+        detected = np.where(f0_mean < 160, 'male', 'female')
+        if gender is None:
+            gender = detected
+        else:
+            gender = np.broadcast_to(np.asarray(gender, dtype=object), f0_mean.shape)
+            missing = np.array([g is None for g in gender.flat], dtype=bool).reshape(f0_mean.shape)
+            gender = np.where(missing, detected, gender)
+            gender = np.array([str(g).lower() for g in gender.flat]).reshape(f0_mean.shape)
+        is_male = gender == 'male'
+        
+        # Base height ranges by gender
+        def param(name):
+            return np.where(is_male, self.MALE[name], self.FEMALE[name])
+        base_height = param('base')
+        min_height = param('min')
+        max_height = param('max')
+        low_f0 = param('low_f0')
+        high_f0 = param('high_f0')
+        span = param('span')
+        
+        # Invert the relationship (lower frequency -> taller): normalize f0
+        # within the expected range and map it to a height centered around
+        # the average. Default to average height if no f0 detected.
+        normalized_f0 = np.clip(f0_mean, low_f0, high_f0)
+        height_modifier = (high_f0 - normalized_f0) / (high_f0 - low_f0) * span
+        height = np.where(f0_mean > 0, base_height + height_modifier - span / 2, base_height)
+        
+        # Ensure height is within reasonable bounds
+        height = np.clip(height, min_height, max_height)
+        
+        if self.is_trained and features.ndim == 2:
+            # The forest's trees disagree more on samples it knows less
+            # about: use their spread as the range and map its width back
+            # onto the rule-based confidence scale
+            height, lower, upper = self.model.predict_interval(features, PREDICTION_COVERAGE)
+            confidence = np.round(np.clip(1 - (upper - lower - 2) / 14, 0.5, 1), 2)
+            height = np.round(height, 1)
+            lower_bound = np.round(lower, 1)
+            upper_bound = np.round(upper, 1)
+        else:
+            # Calculate a fake confidence level
+            # Higher for values closer to the average
+            distance_from_avg = np.abs(height - base_height) / (max_height - min_height)
+            confidence = np.round(np.maximum(0.5, 1 - distance_from_avg), 2)
+            height = np.round(height, 1)
+            
+            # Create range based on confidence (lower confidence = wider range)
+            range_width = (1 - confidence) * 14 + 2  # Min range of 2 cm, max of 16 cm
+            lower_bound = np.round(height - range_width / 2, 1)
+            upper_bound = np.round(height + range_width / 2, 1)
+        
+        imperial = {}
+        for prefix, values in (('', height), ('lower_', lower_bound), ('upper_', upper_bound)):
+            feet, inches, total_inches = self.cm_to_imperial_array(values)
+            imperial[prefix + 'feet'] = feet
+            imperial[prefix + 'inches'] = inches
+            imperial[prefix + 'total_inches'] = total_inches
+        
+        return {
+            'height': height,
+            'confidence': confidence,
+            'lower_bound': lower_bound,
+            'upper_bound': upper_bound,
+            'gender': gender,
+            'imperial': imperial,
+        }
+    
+    def _predict_one(self, features, gender=None):
+        if self.is_trained:
+            if isinstance(features, dict):
+                from feature_extractor import features_to_vector
+                features = features_to_vector(features)
+            return self.predict_batch(np.atleast_2d(np.asarray(features, dtype=float)), [gender])
+        # Extract fundamental frequency features
+        if isinstance(features, dict):
+            f0_mean = features.get('f0_mean', 0)
+        else:
+            # Assuming the first element in the array is f0_mean
+            f0_mean = features[0]
+        return self.predict_batch(np.array([f0_mean], dtype=float), [gender])
+    
     def predict(self, features, gender=None):
         """
         Predict height from voice features
@@ -33,73 +194,16 @@ class HeightPredictor:
         confidence : float
             Confidence level (0-1)
         """
-        # Extract fundamental frequency features
-        if isinstance(features, dict):
-            f0_mean = features.get('f0_mean', 0)
-        else:
-            # Assuming the first element in the array is f0_mean
-            f0_mean = features[0]
-        
-        # Simple heuristic based on research:
-        # Lower voice frequencies typically correlate with taller heights
-        # Female avg height range: 155-170 cm, male: 170-185 cm
-        
-        # Determine gender based on f0 if not provided
-        if gender is None:
-            # Average male F0: 85-155 Hz, female F0: 165-255 Hz
-            gender = 'male' if f0_mean < 160 else 'female'
-        
-        # Base height ranges by gender
-        if gender.lower() == 'male':
-            base_height = 177  # Average male height
-            min_height = 164
-            max_height = 190
-            # Frequency ranges
-            low_f0 = 85
-            high_f0 = 155
-        else:  # female
-            base_height = 164  # Average female height
-            min_height = 152
-            max_height = 176
-            # Frequency ranges
-            low_f0 = 165
-            high_f0 = 255
-        
-        # Invert the relationship (lower frequency -> taller)
-        if f0_mean > 0:
-            if gender.lower() == 'male':
-                # Normalize f0 within expected range
-                normalized_f0 = min(max(f0_mean, low_f0), high_f0)
-                # Map to height (inversely proportional)
-                height_modifier = (high_f0 - normalized_f0) / (high_f0 - low_f0) * 13
-                height = base_height + height_modifier - 6.5  # Centered around average
-            else:
-                # Normalize f0 within expected range
-                normalized_f0 = min(max(f0_mean, low_f0), high_f0)
-                # Map to height (inversely proportional)
-                height_modifier = (high_f0 - normalized_f0) / (high_f0 - low_f0) * 12
-                height = base_height + height_modifier - 6  # Centered around average
-        else:
-            # Default to average height if no f0 detected
-            height = base_height
-        
-        # Ensure height is within reasonable bounds
-        height = min(max(height, min_height), max_height)
-        
-        # Calculate a fake confidence level
-        # Higher for values closer to the average
-        distance_from_avg = abs(height - base_height) / (max_height - min_height)
-        confidence = max(0.5, 1 - distance_from_avg)
-        
-        # In a real model, we would use all features and a trained model
-        # self.model.predict(features)
-        
-        return round(height, 1), round(confidence, 2)
+        result = self._predict_one(features, gender)
+        return float(result['height'][0]), float(result['confidence'][0])
     
     def predict_with_range(self, features, gender=None):
         """
         Predict height with a confidence range
         
+        With a trained model the range encloses PREDICTION_COVERAGE of the
+        per-tree predictions.
+        
         Returns:
         --------
         height : float
@@ -109,15 +213,9 @@ class HeightPredictor:
         upper_bound : float
             Upper bound of the confidence interval
         """
-        height, confidence = self.predict(features, gender)
-        
-        # Create range based on confidence (lower confidence = wider range)
-        range_width = (1 - confidence) * 14 + 2  # Min range of 2 cm, max of 16 cm
-        
-        lower_bound = height - range_width / 2
-        upper_bound = height + range_width / 2
-        
-        return height, round(lower_bound, 1), round(upper_bound, 1)
+        result = self._predict_one(features, gender)
+        return (float(result['height'][0]), float(result['lower_bound'][0]),
+                float(result['upper_bound'][0]))
     
     @staticmethod
     def cm_to_imperial(cm_value):
@@ -142,4 +240,16 @@ class HeightPredictor:
         feet = int(inches_total // 12)
         inches = round(inches_total % 12, 1)
         
-        return feet, inches, round(inches_total, 1) 
\ No newline at end of file
+        return feet, inches, round(inches_total, 1) 
+    
+    @staticmethod
+    def cm_to_imperial_array(cm_values):
+        """
+        Vectorized ``cm_to_imperial`` returning arrays of feet, inches and
+        total inches
+        """
+        inches_total = np.asarray(cm_values, dtype=float) / 2.54
+        feet = (inches_total // 12).astype(int)
+        inches = np.round(inches_total % 12, 1)
+        
+        return feet, inches, np.round(inches_total, 1)
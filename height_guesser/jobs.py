@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import uuid
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker threads running jobs, jobs allowed to wait for a worker, seconds a
+# finished job's result is kept, and an optional directory mirroring job
+# records so every gunicorn worker can answer GET /jobs/<id>
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 32))
+JOB_TTL = float(os.environ.get('JOB_TTL', 600))
+JOB_STORE_DIR = os.environ.get('JOB_STORE_DIR')
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+class JobQueue:
+    """
+    Bounded pool running prediction jobs in the background
+
+    Jobs move through 'queued', 'running' and then 'done' or 'failed'.
+    Finished jobs are kept for ``ttl`` seconds; records carry queue and run
+    timings.
+    """
+    def __init__(self, run, workers=JOB_WORKERS, max_queue=JOB_QUEUE_SIZE, ttl=JOB_TTL,
+                 directory=JOB_STORE_DIR):
+        self.run = run
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.directory = directory
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._condition = threading.Condition()
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def submit(self, *args):
+        """Queue ``run(*args)`` and return the new job's id"""
+        with self._condition:
+            self._expire()
+            if self.depth() >= self.max_queue:
+                raise QueueFull(f"Job queue is full ({self.max_queue} jobs waiting)")
+            job_id = uuid.uuid4().hex
+            job = {'id': job_id, 'status': 'queued', 'submitted_at': time.time()}
+            self._jobs[job_id] = job
+            self._save(job)
+        self._executor.submit(self._work, job_id, args)
+        return job_id
+
+    def get(self, job_id, wait=0):
+        """
+        Public record of a job, or None if it is unknown or expired
+
+        With ``wait`` > 0, blocks up to that many seconds for the job to
+        finish (long polling).
+        """
+        deadline = time.time() + wait
+        with self._condition:
+            self._expire()
+            job = self._jobs.get(job_id)
+            while job is not None and job['status'] in ('queued', 'running'):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+                job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        # Not submitted through this process: poll the shared directory
+        job = self._load(job_id)
+        while job is not None and job['status'] in ('queued', 'running') and time.time() < deadline:
+            time.sleep(0.1)
+            job = self._load(job_id)
+        return job
+
+    def depth(self):
+        """Number of jobs waiting for a worker"""
+        return sum(1 for job in self._jobs.values() if job['status'] == 'queued')
+
+    def stats(self):
+        """Queue depth, running jobs and completion counters"""
+        with self._condition:
+            self._expire()
+            return {
+                'queued': self.depth(),
+                'running': sum(1 for job in self._jobs.values() if job['status'] == 'running'),
+                'completed': self.completed,
+                'failed': self.failed,
+                'expired': self.expired,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'ttl': self.ttl,
+            }
+
+    def _work(self, job_id, args):
+        with self._condition:
+            job = self._jobs[job_id]
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+            job['queue_seconds'] = round(job['started_at'] - job['submitted_at'], 4)
+            self._save(job)
+        try:
+            result = self.run(*args)
+            update = {'status': 'done', 'result': result}
+        except Exception as e:
+            update = {'status': 'failed', 'error': str(e)}
+        with self._condition:
+            job.update(update)
+            job['finished_at'] = time.time()
+            job['run_seconds'] = round(job['finished_at'] - job['started_at'], 4)
+            job['expires_at'] = job['finished_at'] + self.ttl
+            if job['status'] == 'done':
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._save(job)
+            self._condition.notify_all()
+
+    def _expire(self):
+        """Drop finished jobs past their expiry time (caller holds the lock)"""
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.get('expires_at', now + 1) <= now:
+                del self._jobs[job_id]
+                self.expired += 1
+                if self.directory:
+                    try:
+                        os.remove(self._path(job_id))
+                    except OSError:
+                        pass
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, job_id + '.json')
+
+    def _save(self, job):
+        if not self.directory:
+            return
+        try:
+            # Atomic rename so readers in other workers never see a partial record
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(job, f)
+            os.replace(tmp_path, self._path(job['id']))
+        except OSError:
+            pass
+
+    def _load(self, job_id):
+        """Job record written by another worker, if it has not expired"""
+        if not self.directory or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job.get('expires_at', time.time() + 1) <= time.time():
+            return None
+        return job
@@ -0,0 +1,132 @@
+import os
+import time
+import uuid
+import threading
+import numpy as np
+
+from streaming import StreamingFeatureExtractor
+
+# Concurrent recording sessions, seconds of audio one session may stream,
+# idle seconds before an abandoned session is dropped, and frames analysed
+# per window (32 frames is about 0.35 s at 48 kHz, so estimates follow the
+# speaker closely; larger windows cost less per second of audio)
+LIVE_MAX_SESSIONS = int(os.environ.get('LIVE_MAX_SESSIONS', 32))
+LIVE_MAX_SECONDS = float(os.environ.get('LIVE_MAX_SECONDS', 120))
+LIVE_TTL = float(os.environ.get('LIVE_TTL', 60))
+LIVE_WINDOW_FRAMES = int(os.environ.get('LIVE_WINDOW_FRAMES', 32))
+
+# Live audio is analysed as it arrives, so /predict's whole-clip steps
+# are not applied; every live result carries this in its analysis
+LIVE_ANALYSIS_NOTE = ("Analysed at the client's sample rate without the analysis profile or silence "
+                      "removal applied by /predict, so the result can differ slightly from uploading "
+                      "the same recording")
+
+# Sample rates a client may stream at
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 96000
+
+class SessionLimit(Exception):
+    """Raised when a session is started while LIVE_MAX_SESSIONS are open"""
+
+class RecordingTooLong(Exception):
+    """Raised when a session would exceed LIVE_MAX_SECONDS of audio"""
+
+def pcm_to_float(data):
+    """Mono float32 samples from 16-bit little-endian PCM bytes"""
+    if len(data) % 2:
+        raise ValueError("PCM data must be 16-bit samples (an even number of bytes)")
+    return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+
+class LiveSession:
+    """
+    One recording being streamed: a StreamingFeatureExtractor plus the
+    client's settings
+
+    ``lock`` serializes the chunks of a session; memory is bounded by the
+    extractor's analysis window whatever the recording length.
+    """
+    def __init__(self, sr, gender=None, window_frames=LIVE_WINDOW_FRAMES):
+        self.id = uuid.uuid4().hex
+        self.sr = sr
+        self.gender = gender
+        self.extractor = StreamingFeatureExtractor(sr, window_frames=window_frames)
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+
+    @property
+    def seconds(self):
+        return self.extractor.n_samples / self.sr
+
+class LiveSessions:
+    """
+    Open live recording sessions of this process
+
+    Sessions are kept in memory, so with several gunicorn workers every
+    request of a session must reach the worker that created it.
+    """
+    def __init__(self, max_sessions=LIVE_MAX_SESSIONS, max_seconds=LIVE_MAX_SECONDS, ttl=LIVE_TTL,
+                 window_frames=LIVE_WINDOW_FRAMES):
+        self.max_sessions = max_sessions
+        self.max_seconds = max_seconds
+        self.ttl = ttl
+        self.window_frames = window_frames
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.finished = 0
+        self.expired = 0
+
+    def create(self, sr, gender=None):
+        """Open a session for audio at sample rate ``sr``"""
+        if not MIN_SAMPLE_RATE <= sr <= MAX_SAMPLE_RATE:
+            raise ValueError(f"Sample rate must be between {MIN_SAMPLE_RATE} and {MAX_SAMPLE_RATE} Hz")
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimit(f"Too many live sessions ({self.max_sessions} open)")
+            session = LiveSession(sr, gender, self.window_frames)
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        """An open session, or None if it is unknown, finished or expired"""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_seen = time.monotonic()
+            return session
+
+    def finish(self, session_id):
+        """Close a session and return it (None if it is not open)"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self.finished += 1
+            return session
+
+    def update(self, session, data):
+        """Add a chunk of 16-bit PCM to a session (caller holds its lock)"""
+        samples = pcm_to_float(data)
+        if session.seconds + len(samples) / session.sr > self.max_seconds:
+            raise RecordingTooLong(f"Recording longer than {self.max_seconds:g} seconds")
+        session.extractor.update(samples)
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            return {
+                'open': len(self._sessions),
+                'finished': self.finished,
+                'expired': self.expired,
+                'max_sessions': self.max_sessions,
+                'max_seconds': self.max_seconds,
+                'ttl': self.ttl,
+            }
+
+    def _expire(self):
+        """Drop sessions idle for longer than the TTL (caller holds the lock)"""
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_seen > self.ttl:
+                del self._sessions[session_id]
+                self.expired += 1
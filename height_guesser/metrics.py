@@ -0,0 +1,190 @@
+"""
+Low-overhead stage timers and Prometheus-format metrics
+
+Code on the hot path wraps each stage in ``with stage('name'):``. Each
+timing is added to a per-stage latency histogram and to the current
+request's timings, which app.py sends back as a Server-Timing header and
+serves in the Prometheus text format at /metrics.
+
+With METRICS=0, ``stage`` returns a shared no-op context manager and
+nothing is recorded. Metrics are kept per process; with several gunicorn
+workers, each worker reports its own counts.
+"""
+
+import os
+import time
+import bisect
+import threading
+
+METRICS_ENABLED = os.environ.get('METRICS', '1').lower() in ('1', 'true', 'yes')
+
+PREFIX = 'height_guesser_'
+
+# Upper bounds of the histogram buckets (+Inf is implied)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DURATION_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+FRACTION_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# Metric name: (type, help text, histogram buckets)
+METRIC_TYPES = {
+    'stage_seconds': ('histogram', 'Time spent in each pipeline stage and feature', LATENCY_BUCKETS),
+    'request_seconds': ('histogram', 'Prediction request latency', LATENCY_BUCKETS),
+    'audio_duration_seconds': ('histogram', 'Duration of decoded uploads', DURATION_BUCKETS),
+    'analysed_fraction': ('histogram', 'Share of each upload left after silence is removed', FRACTION_BUCKETS),
+    'service_batch_size': ('histogram', 'Clips per extraction service micro-batch', BATCH_BUCKETS),
+    'service_queue_seconds': ('histogram', 'Time clips wait for an extraction service batch', LATENCY_BUCKETS),
+    'service_queue_depth': ('histogram', 'Clips left waiting when a micro-batch is formed', BATCH_BUCKETS),
+    'requests_total': ('counter', 'Prediction requests by endpoint, file type and status', None),
+    'errors_total': ('counter', 'Exceptions raised, by the stage they were raised in', None),
+}
+
+class Histogram:
+    """Cumulative-bucket histogram with a running sum and count"""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Registry:
+    """Thread-safe store of labelled histograms and counters"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(METRIC_TYPES[name][2])
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets)
+                          for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = []
+        for name, (kind, help_text, _) in METRIC_TYPES.items():
+            lines.append(f'# HELP {PREFIX}{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}{name} {kind}')
+            if kind == 'histogram':
+                for (metric, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                        cumulative += bucket_count
+                        bucket_labels = _labels(labels + (('le', str(bound)),))
+                        lines.append(f'{PREFIX}{name}_bucket{bucket_labels} {cumulative}')
+                    lines.append(f'{PREFIX}{name}_sum{_labels(labels)} {total}')
+                    lines.append(f'{PREFIX}{name}_count{_labels(labels)} {count}')
+            else:
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{PREFIX}{name}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+# FeatureCache.stats() counter -> event label of feature_cache_events_total
+CACHE_EVENTS = {'hits': 'hit', 'disk_hits': 'disk_hit', 'misses': 'miss', 'evictions': 'eviction'}
+
+def render_cache(stats):
+    """Feature cache counters and size (``FeatureCache.stats()``) in the text format"""
+    lines = [f'# HELP {PREFIX}feature_cache_events_total Feature cache hits, disk hits, misses and evictions',
+             f'# TYPE {PREFIX}feature_cache_events_total counter']
+    for key, event in CACHE_EVENTS.items():
+        lines.append(f'{PREFIX}feature_cache_events_total{_labels((("event", event),))} {stats[key]}')
+    lines += [f'# HELP {PREFIX}feature_cache_entries Entries in the in-memory feature cache',
+              f'# TYPE {PREFIX}feature_cache_entries gauge',
+              f'{PREFIX}feature_cache_entries {stats["entries"]}']
+    return '\n'.join(lines) + '\n'
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+registry = Registry()
+
+# Timings of the request being handled by the current thread
+_local = threading.local()
+
+def start_request():
+    """Begin collecting stage timings for the current thread's request"""
+    if METRICS_ENABLED:
+        _local.timings = {}
+        _local.error = None
+
+def request_timings():
+    """Stage timings collected since ``start_request`` (empty if disabled)"""
+    return getattr(_local, 'timings', None) or {}
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        registry.observe('stage_seconds', elapsed, stage=self.name)
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed
+        # Count an exception once, in the innermost stage it passed through
+        if exc_value is not None and getattr(_local, 'error', None) is not exc_value:
+            _local.error = exc_value
+            registry.increment('errors_total', stage=self.name, type=exc_type.__name__)
+        return False
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NO_STAGE = _NoStage()
+
+def stage(name):
+    """Context manager timing a named stage (a no-op with METRICS=0)"""
+    return _Stage(name) if METRICS_ENABLED else _NO_STAGE
+
+def observe(name, value, **labels):
+    if METRICS_ENABLED:
+        registry.observe(name, value, **labels)
+
+def increment(name, amount=1, **labels):
+    if METRICS_ENABLED:
+        registry.increment(name, amount, **labels)
+
+def server_timing(timings):
+    """Server-Timing header value for a dict of stage seconds"""
+    return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items())
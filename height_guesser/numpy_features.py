@@ -0,0 +1,174 @@
+"""
+Pure-NumPy implementations of the librosa routines used for feature extraction
+
+Used as the extraction backend where librosa (and numba/scipy) cannot be
+installed or are too slow to import, such as serverless deployments. The
+functions take the same arguments as the librosa calls they replace and
+follow librosa's defaults: periodic Hann window, zero-padded centered
+frames, Slaney mel scale and normalization, orthonormal DCT-II. Audio is
+decoded with soundfile and F0 is tracked with the NumPy YIN tracker in
+pitch.py.
+
+Agreement with the librosa backend is checked by
+benchmarks/numpy_backend.py.
+"""
+
+import functools
+import numpy as np
+
+# Documented agreement with the librosa backend (relative tolerance on every
+# statistic except F0, which comes from yin instead of pyin). Differences
+# come from float64 instead of float32 arithmetic and from resampling.
+NUMPY_RTOL = 1e-3
+
+def load(path):
+    """Decode an audio file to a mono float32 signal, as ``librosa.load(sr=None)``"""
+    import soundfile as sf
+    y, sr = sf.read(path, dtype='float32')
+    if y.ndim > 1:
+        y = np.mean(y, axis=1)
+    return y, sr
+
+def resample(y, orig_sr, target_sr):
+    """Band-limited resampling by zero-padding or truncating the spectrum"""
+    if orig_sr == target_sr:
+        return y
+    n_out = int(np.ceil(len(y) * target_sr / orig_sr))
+    spectrum = np.fft.rfft(y)
+    n_bins = n_out // 2 + 1
+    if n_bins <= len(spectrum):
+        spectrum = spectrum[:n_bins]
+    else:
+        spectrum = np.pad(spectrum, (0, n_bins - len(spectrum)))
+    return (np.fft.irfft(spectrum, n_out) * (n_out / len(y))).astype(y.dtype)
+
+@functools.lru_cache(maxsize=8)
+def hann(n_fft):
+    """Periodic Hann window (``scipy.signal.get_window('hann', n_fft)``)"""
+    return 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)
+
+def stft(y, n_fft=2048, hop_length=512):
+    """Complex STFT of a signal, (1 + n_fft // 2, n_frames), centered frames"""
+    y = np.pad(np.asarray(y, dtype=np.float64), n_fft // 2, mode='constant')
+    if len(y) < n_fft:
+        y = np.pad(y, (0, n_fft - len(y)))
+    n_frames = 1 + (len(y) - n_fft) // hop_length
+    frames = np.lib.stride_tricks.as_strided(
+        y, shape=(n_frames, n_fft), strides=(y.strides[0] * hop_length, y.strides[0]),
+        writeable=False)
+    return np.fft.rfft(frames * hann(n_fft), axis=1).T
+
+def stft_batch(signals, n_fft=2048, hop_length=512):
+    """
+    Complex STFTs of several signals from one batched FFT
+
+    The frames of every signal are stacked and transformed together, then
+    split back; each result equals ``stft`` of that signal.
+    """
+    frames = []
+    for y in signals:
+        y = np.pad(np.asarray(y, dtype=np.float64), n_fft // 2, mode='constant')
+        if len(y) < n_fft:
+            y = np.pad(y, (0, n_fft - len(y)))
+        n_frames = 1 + (len(y) - n_fft) // hop_length
+        frames.append(np.lib.stride_tricks.as_strided(
+            y, shape=(n_frames, n_fft), strides=(y.strides[0] * hop_length, y.strides[0]),
+            writeable=False))
+    spectra = np.fft.rfft(np.concatenate(frames) * hann(n_fft), axis=1)
+    bounds = np.cumsum([len(f) for f in frames])[:-1]
+    return [part.T for part in np.split(spectra, bounds)]
+
+def fft_frequencies(sr, n_fft):
+    return np.fft.rfftfreq(n_fft, 1.0 / sr)
+
+def hz_to_mel(frequencies):
+    """Slaney mel scale: linear below 1 kHz, logarithmic above"""
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    mels = frequencies / (200.0 / 3)
+    log_region = frequencies >= 1000.0
+    mels = np.where(log_region, 15.0 + np.log(np.maximum(frequencies, 1e-10) / 1000.0) / (np.log(6.4) / 27.0),
+                    mels)
+    return mels
+
+def mel_to_hz(mels):
+    mels = np.asarray(mels, dtype=np.float64)
+    frequencies = mels * (200.0 / 3)
+    return np.where(mels >= 15.0, 1000.0 * np.exp((np.log(6.4) / 27.0) * (mels - 15.0)), frequencies)
+
+@functools.lru_cache(maxsize=16)
+def mel_filters(sr, n_fft, n_mels=128):
+    """Slaney-normalized triangular mel filterbank, (n_mels, 1 + n_fft // 2)"""
+    fftfreqs = fft_frequencies(sr, n_fft)
+    mel_f = mel_to_hz(np.linspace(hz_to_mel(0.0), hz_to_mel(sr / 2.0), n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = mel_f[:, None] - fftfreqs[None, :]
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:n_mels + 2] - mel_f[:n_mels]))[:, None]
+    return weights
+
+def melspectrogram(S, sr, n_fft=2048, n_mels=128):
+    """Mel spectrogram from a power spectrogram"""
+    return mel_filters(sr, n_fft, n_mels) @ S
+
+def power_to_db(S, ref=1.0, amin=1e-10, top_db=80.0):
+    """Power spectrogram in dB; ``ref`` may be a callable such as np.max"""
+    log_spec = 10.0 * np.log10(np.maximum(amin, S))
+    ref_value = ref(S) if callable(ref) else ref
+    log_spec -= 10.0 * np.log10(np.maximum(amin, ref_value))
+    return np.maximum(log_spec, log_spec.max() - top_db)
+
+@functools.lru_cache(maxsize=8)
+def dct_matrix(n_out, n_in):
+    """First ``n_out`` rows of the orthonormal DCT-II of length ``n_in``"""
+    k = np.arange(n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_in)) * np.sqrt(2.0 / n_in)
+    basis[0] /= np.sqrt(2.0)
+    return basis
+
+def mfcc(S, n_mfcc=20):
+    """MFCCs from a log-power (dB) mel spectrogram"""
+    return dct_matrix(n_mfcc, S.shape[0]) @ S
+
+def _normalize_columns(S):
+    # Columns summing to (almost) zero are left unscaled, as librosa does
+    total = S.sum(axis=0, keepdims=True)
+    return S / np.where(total < np.finfo(S.dtype).tiny, 1.0, total)
+
+def spectral_centroid(S, sr, n_fft=2048):
+    freq = fft_frequencies(sr, n_fft)[:, None]
+    return np.sum(freq * _normalize_columns(S), axis=0, keepdims=True)
+
+def spectral_bandwidth(S, sr, centroid, n_fft=2048):
+    freq = fft_frequencies(sr, n_fft)[:, None]
+    deviation = np.abs(freq - centroid)
+    return np.sum(_normalize_columns(S) * deviation ** 2, axis=0, keepdims=True) ** 0.5
+
+def spectral_rolloff(S, sr, n_fft=2048, roll_percent=0.85):
+    freq = fft_frequencies(sr, n_fft)[:, None]
+    total_energy = np.cumsum(S, axis=0)
+    threshold = roll_percent * total_energy[-1]
+    below = total_energy < threshold
+    return np.min(np.where(below, np.inf, freq), axis=0, keepdims=True)
+
+def zero_crossing_rate(y, frame_length=2048, hop_length=512):
+    """Fraction of sign changes per centered frame (edge padded)"""
+    y = np.pad(np.asarray(y), frame_length // 2, mode='edge')
+    n_frames = 1 + (len(y) - frame_length) // hop_length
+    frames = np.lib.stride_tricks.as_strided(
+        y, shape=(n_frames, frame_length), strides=(y.strides[0] * hop_length, y.strides[0]),
+        writeable=False)
+    # Near-zero samples count as positive
+    signs = np.signbit(np.where(np.abs(frames) <= 1e-10, 0, frames))
+    return (np.sum(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length)[None, :]
+
+def rms(y, frame_length=2048, hop_length=512):
+    """Per-frame RMS of centered frames (zero padded)"""
+    y = np.pad(np.asarray(y), frame_length // 2, mode='constant')
+    n_frames = 1 + (len(y) - frame_length) // hop_length
+    frames = np.lib.stride_tricks.as_strided(
+        y, shape=(n_frames, frame_length), strides=(y.strides[0] * hop_length, y.strides[0]),
+        writeable=False)
+    return np.sqrt(np.mean(np.abs(frames) ** 2, axis=1))[None, :]
@@ -0,0 +1,230 @@
+import os
+import numpy as np
+
+# Pitch search range used by the original extractor (C2-C7)
+FMIN = 65.40639132514966
+FMAX = 2093.004522404789
+
+# Frame parameters shared by every backend (librosa.pyin defaults)
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+
+# Available F0 trackers. 'pyin' is librosa's probabilistic YIN with Viterbi
+# decoding; 'yin' is the vectorized NumPy tracker below, which processes the
+# whole frame matrix at once and is much faster at a small accuracy cost
+# (see benchmarks/pitch_accuracy.py).
+PITCH_BACKENDS = ('pyin', 'yin')
+PITCH_BACKEND = os.environ.get('PITCH_BACKEND', 'pyin')
+
+# Pitch search modes. 'full' searches the whole C2-C7 range; 'speech' runs a
+# cheap YIN pass on a decimated copy of the signal to locate the speaker's
+# pitch region, then runs the selected backend only inside a narrowed band
+# around it (see benchmarks/pitch_range.py for timings).
+PITCH_RANGES = ('full', 'speech')
+PITCH_RANGE = os.environ.get('PITCH_RANGE', 'full')
+
+# Limits of the speech mode: adult speech F0 stays within 50-500 Hz, and the
+# narrowed band extends the coarse estimate by SPEECH_MARGIN octaves
+SPEECH_FMIN = 50.0
+SPEECH_FMAX = 500.0
+SPEECH_MARGIN = 0.5
+COARSE_SR = 4000
+
+def frame_signal(y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH, center=True):
+    """
+    Slice a signal into a (n_frames, frame_length) matrix of overlapping frames
+
+    The result is a read-only strided view, so framing costs no copy.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if center:
+        y = np.pad(y, frame_length // 2, mode='constant')
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)), mode='constant')
+    n_frames = 1 + (len(y) - frame_length) // hop_length
+    return np.lib.stride_tricks.as_strided(
+        y,
+        shape=(n_frames, frame_length),
+        strides=(y.strides[0] * hop_length, y.strides[0]),
+        writeable=False,
+    )
+
+def yin(y, sr, fmin=FMIN, fmax=FMAX, frame_length=FRAME_LENGTH,
+        hop_length=HOP_LENGTH, threshold=0.15, center=True):
+    """
+    Vectorized YIN fundamental frequency tracker
+
+    Every step (difference function, cumulative mean normalization, threshold
+    search and parabolic refinement) operates on the full frame matrix, so
+    there is no per-frame Python loop and no Viterbi decoding.
+
+    Parameters:
+    -----------
+    y : numpy.ndarray
+        Audio signal
+    sr : int
+        Sample rate of ``y``
+    fmin, fmax : float
+        Pitch search range in Hz
+    frame_length : int
+        Analysis frame length in samples
+    hop_length : int
+        Number of samples between frames
+    threshold : float
+        Absolute threshold on the normalized difference for a frame to count
+        as voiced
+    center : bool
+        Center frames on their time stamps by zero-padding the signal (as
+        librosa does); with False the first frame starts at sample 0
+
+    Returns:
+    --------
+    f0 : numpy.ndarray
+        F0 per frame in Hz, NaN for unvoiced frames
+    """
+    frames = frame_signal(y, frame_length, hop_length, center=center)
+    return yin_frames(frames, sr, fmin=fmin, fmax=fmax, threshold=threshold)
+
+def yin_batch(signals, sr, fmin=FMIN, fmax=FMAX, frame_length=FRAME_LENGTH,
+              hop_length=HOP_LENGTH, threshold=0.15, center=True):
+    """
+    YIN over several signals of the same sample rate in one pass
+
+    The frames of all signals are stacked into one matrix, so the FFTs and
+    the search run once for the whole batch. Returns one F0 track per
+    signal, identical to calling ``yin`` on each.
+    """
+    frames = [frame_signal(y, frame_length, hop_length, center=center) for y in signals]
+    f0 = yin_frames(np.concatenate(frames), sr, fmin=fmin, fmax=fmax, threshold=threshold)
+    return np.split(f0, np.cumsum([len(f) for f in frames])[:-1])
+
+def yin_frames(frames, sr, fmin=FMIN, fmax=FMAX, threshold=0.15):
+    """YIN F0 of every row of a (n_frames, frame_length) frame matrix"""
+    frame_length = frames.shape[1]
+    win_length = frame_length // 2
+    tau_min = max(1, int(np.floor(sr / fmax)))
+    tau_max = min(win_length - 1, int(np.ceil(sr / fmin)))
+
+    # Difference function d(tau) = E(0) + E(tau) - 2 r(tau), with the
+    # autocorrelation r computed for all frames with one batched real FFT
+    n_fft = 1 << int(np.ceil(np.log2(frame_length + win_length)))
+    spectrum = np.fft.rfft(frames, n_fft, axis=1)
+    head = np.fft.rfft(frames[:, :win_length], n_fft, axis=1)
+    r = np.fft.irfft(np.conj(head) * spectrum, n_fft, axis=1)[:, :tau_max + 1]
+
+    energy = np.cumsum(frames ** 2, axis=1)
+    energy = np.concatenate([np.zeros((len(frames), 1)), energy], axis=1)
+    taus = np.arange(tau_max + 1)
+    window_energy = energy[:, taus + win_length] - energy[:, taus]
+    diff = window_energy[:, :1] + window_energy - 2 * r
+    diff = np.maximum(diff, 0)
+
+    # Cumulative mean normalized difference
+    cumulative = np.cumsum(diff[:, 1:], axis=1)
+    cmnd = np.ones_like(diff)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cmnd[:, 1:] = diff[:, 1:] * taus[1:] / cumulative
+    cmnd[~np.isfinite(cmnd)] = 1.0
+
+    # First local minimum below the threshold inside the search range
+    search = cmnd[:, tau_min:tau_max]
+    is_trough = np.zeros_like(search, dtype=bool)
+    is_trough[:, 1:-1] = (search[:, 1:-1] <= search[:, :-2]) & (search[:, 1:-1] <= search[:, 2:])
+    candidates = is_trough & (search < threshold)
+    voiced = candidates.any(axis=1)
+    best = np.argmax(candidates, axis=1) + tau_min
+
+    # Parabolic interpolation around the chosen lag
+    rows = np.arange(len(frames))
+    left = cmnd[rows, np.clip(best - 1, 0, tau_max)]
+    mid = cmnd[rows, best]
+    right = cmnd[rows, np.clip(best + 1, 0, tau_max)]
+    denom = left - 2 * mid + right
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shift = np.where(np.abs(denom) > 1e-12, 0.5 * (left - right) / denom, 0.0)
+    period = best + np.clip(shift, -1, 1)
+
+    f0 = np.full(len(frames), np.nan)
+    f0[voiced] = sr / period[voiced]
+    return f0
+
+def decimate(y, sr, target_sr=COARSE_SR):
+    """
+    Downsample by an integer factor after a windowed-sinc low-pass filter
+
+    Returns the decimated signal and its sample rate. Signals already at or
+    below ``target_sr`` are returned unchanged.
+    """
+    factor = int(sr // target_sr)
+    if factor <= 1:
+        return np.asarray(y, dtype=np.float64), sr
+    half = 8 * factor
+    n = np.arange(-half, half + 1)
+    taps = np.sinc(n / factor) * np.hamming(len(n))
+    taps /= taps.sum()
+    filtered = np.convolve(y, taps, mode='same')
+    return filtered[::factor], sr / factor
+
+def speech_pitch_band(y, sr):
+    """
+    Estimate the speaker's pitch band from a coarse, decimated YIN pass
+
+    The 5th-95th percentile of the coarse F0 track is widened by
+    SPEECH_MARGIN octaves on both sides and clipped to the speech limits.
+    Falls back to the full speech range if nothing voiced is found.
+    """
+    coarse, coarse_sr = decimate(y, sr)
+    frame_length = 256
+    f0 = yin(coarse, coarse_sr, fmin=SPEECH_FMIN, fmax=SPEECH_FMAX,
+             frame_length=frame_length, hop_length=frame_length // 2)
+    f0 = f0[~np.isnan(f0)]
+    if len(f0) == 0:
+        return SPEECH_FMIN, SPEECH_FMAX
+    low, high = np.percentile(f0, [5, 95])
+    fmin = max(SPEECH_FMIN, low * 2 ** -SPEECH_MARGIN)
+    fmax = min(SPEECH_FMAX, high * 2 ** SPEECH_MARGIN)
+    return fmin, fmax
+
+def estimate_f0(y, sr, backend=None, pitch_range=None, fmin=FMIN, fmax=FMAX, center=True):
+    """
+    Track F0 over a signal with the selected backend
+
+    In the 'speech' pitch range the ``fmin``/``fmax`` arguments are replaced
+    by the band found by ``speech_pitch_band``. With ``center=False`` the
+    first frame starts at sample 0 instead of being centered on it.
+
+    Returns the per-frame F0 in Hz with NaN for unvoiced frames.
+    """
+    backend = backend or PITCH_BACKEND
+    pitch_range = pitch_range or PITCH_RANGE
+    if pitch_range == 'speech':
+        fmin, fmax = speech_pitch_band(y, sr)
+    elif pitch_range != 'full':
+        raise ValueError(f"Unknown pitch range '{pitch_range}'. Choose one of: {', '.join(PITCH_RANGES)}")
+    if backend == 'pyin':
+        import librosa
+        f0, voiced_flag, voiced_probs = librosa.pyin(y,
+                                                   fmin=fmin,
+                                                   fmax=fmax,
+                                                   sr=sr,
+                                                   frame_length=FRAME_LENGTH,
+                                                   hop_length=HOP_LENGTH,
+                                                   center=center)
+        return f0
+    if backend == 'yin':
+        return yin(y, sr, fmin=fmin, fmax=fmax, center=center)
+    raise ValueError(f"Unknown pitch backend '{backend}'. Choose one of: {', '.join(PITCH_BACKENDS)}")
+
+def f0_statistics(f0):
+    """
+    Summarize an F0 track into the f0_mean/f0_std/f0_min/f0_max features
+    """
+    f0 = f0[~np.isnan(f0)]  # Remove NaN values
+    if len(f0) > 0:
+        return {
+            'f0_mean': np.mean(f0),
+            'f0_std': np.std(f0),
+            'f0_min': np.min(f0),
+            'f0_max': np.max(f0),
+        }
+    return {'f0_mean': 0, 'f0_std': 0, 'f0_min': 0, 'f0_max': 0}
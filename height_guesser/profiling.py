@@ -0,0 +1,188 @@
+"""
+On-demand profiling of a single prediction
+
+A profiled run executes under cProfile (written as a .pstats dump) while a
+sampling thread records the call stacks of the profiled thread (written in
+the collapsed-stack format read by flamegraph.pl, speedscope and
+inferno). Code inside ``with allocations('extract'):`` is additionally
+traced with tracemalloc. Only one run is profiled at a time per process.
+
+/predict profiles a request when it carries an X-Profile-Token header
+matching PROFILE_TOKEN; without PROFILE_TOKEN set, profiling is disabled.
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import tempfile
+import threading
+import tracemalloc
+import contextlib
+from collections import Counter
+
+# Shared secret admins send to profile a request, and where profiles go
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'height_guesser_profiles'))
+
+# Seconds between stack samples, and entries listed in the summaries
+SAMPLE_INTERVAL = 0.001
+TOP_N = 20
+
+PROFILE_FILES = ('pstats', 'collapsed', 'json')
+
+_lock = threading.Lock()
+_local = threading.local()
+
+class ProfilerBusy(Exception):
+    """Raised when a run is profiled while another one is in progress"""
+
+def authorized(token):
+    """Whether a request's token grants profiling"""
+    if not PROFILE_TOKEN or token is None:
+        return False
+    return hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+class RequestProfile:
+    """
+    Context manager profiling the code run inside it
+
+    Parameters:
+    -----------
+    directory : str
+        Where ``<id>.pstats``, ``<id>.collapsed`` and ``<id>.json`` (the
+        summary) are written
+    interval : float
+        Seconds between call stack samples
+    """
+    def __init__(self, directory=PROFILE_DIR, interval=SAMPLE_INTERVAL):
+        self.id = uuid.uuid4().hex
+        self.directory = directory
+        self.interval = interval
+        self.allocations = {}
+        self.seconds = None
+        self._stacks = Counter()
+        self._paused = False
+
+    def __enter__(self):
+        if not _lock.acquire(blocking=False):
+            raise ProfilerBusy("Another request is being profiled")
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+        self._sampler.start()
+        _local.profile = self
+        self._start = time.perf_counter()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profiler.disable()
+        self.seconds = time.perf_counter() - self._start
+        self._stop.set()
+        self._sampler.join()
+        _local.profile = None
+        try:
+            self._write()
+        finally:
+            _lock.release()
+        return False
+
+    def path(self, kind):
+        return os.path.join(self.directory, f'{self.id}.{kind}')
+
+    def summary(self):
+        """Timings, hottest functions and allocation statistics of the run"""
+        stats = pstats.Stats(self._profiler)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        top = [{
+            'function': f'{os.path.basename(filename)}:{line}({name})',
+            'calls': calls,
+            'total_seconds': round(total, 6),
+            'cumulative_seconds': round(cumulative, 6),
+        } for (filename, line, name), (_, calls, total, cumulative, _) in functions[:TOP_N]]
+        return {
+            'id': self.id,
+            'seconds': round(self.seconds, 4),
+            'samples': sum(self._stacks.values()),
+            'files': {kind: self.path(kind) for kind in PROFILE_FILES},
+            'top_functions': top,
+            'allocations': self.allocations,
+        }
+
+    @contextlib.contextmanager
+    def paused(self):
+        """Exclude the profiler's own bookkeeping from the profile"""
+        self._profiler.disable()
+        self._paused = True
+        try:
+            yield
+        finally:
+            self._paused = False
+            self._profiler.enable()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            if self._paused:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self._stacks[';'.join(reversed(stack))] += 1
+
+    def _write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._profiler.dump_stats(self.path('pstats'))
+        with open(self.path('collapsed'), 'w') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        with open(self.path('json'), 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+@contextlib.contextmanager
+def allocations(name):
+    """
+    Trace memory allocations of a block when the current thread is profiled
+
+    Records the peak and retained traced bytes and the source lines holding
+    the most retained memory under ``name`` in the active profile's
+    ``allocations``. Does nothing outside a profiled run.
+    """
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    was_tracing = tracemalloc.is_tracing()
+    if was_tracing:
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    try:
+        yield
+    finally:
+        with profile.paused():
+            current, peak = tracemalloc.get_traced_memory()
+            statistics = tracemalloc.take_snapshot().statistics('lineno')
+            if not was_tracing:
+                tracemalloc.stop()
+            own_files = (tracemalloc.__file__, __file__)
+            top = [stat for stat in statistics if stat.traceback[0].filename not in own_files][:TOP_N]
+            profile.allocations[name] = {
+                'peak_bytes': peak - baseline,
+                'retained_bytes': current - baseline,
+                'top_retained': [{
+                    'location': str(stat.traceback[0]),
+                    'size_bytes': stat.size,
+                    'count': stat.count,
+                } for stat in top],
+            }
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Cold-start helpers: persistent numba cache, optional warm-up and timings
+
+Import this module before anything that pulls in librosa so NUMBA_CACHE_DIR
+is set before numba loads. Run it as a script to measure a cold start:
+
+    python startup.py [--no-warmup]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+
+# Compiled numba functions (pyin, spectral helpers) are cached on disk so a
+# restarted process loads them instead of recompiling. Point NUMBA_CACHE_DIR
+# at a directory that survives restarts (e.g. one baked into the image).
+NUMBA_CACHE_DIR = os.environ.setdefault(
+    'NUMBA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'height_guesser_numba'))
+
+# Run a warm-up extraction on a synthetic clip when the app starts
+WARMUP = os.environ.get('WARMUP', '0').lower() in ('1', 'true', 'yes')
+
+# Seconds spent importing the app, warming up and serving the first request
+STARTUP_TIMINGS = {}
+
+def record(name, seconds):
+    """Store a startup timing (only the first value for each name is kept)"""
+    STARTUP_TIMINGS.setdefault(name, round(seconds, 4))
+
+def warm_up(keys=None):
+    """
+    Run the /predict pipeline once on a synthetic clip
+
+    Decoding, profiling, extraction and prediction all run, so lazy imports
+    and numba compilation (or cache loading) happen before the first real
+    request. Returns the seconds taken.
+    """
+    import soundfile as sf
+    from audio_io import decode_audio, apply_profile
+    from feature_extractor import extract_features_from_audio, features_to_vector
+    from height_predictor import HeightPredictor
+    from synthetic import synthetic_voice
+    from vad import trim_silence
+
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    sf.write(buffer, synthetic_voice(duration=1.0), 22050, format='WAV')
+    y, sr = decode_audio(buffer.getvalue(), 'wav')
+    y, sr, _ = apply_profile(y, sr)
+    y, _ = trim_silence(y, sr)
+    predictor = HeightPredictor()
+    keys = predictor.required_features if keys is None else keys
+    features = extract_features_from_audio(y, sr, keys=keys)
+    predictor.predict_batch([features_to_vector(features)])
+    seconds = time.perf_counter() - start
+    record('warmup_seconds', seconds)
+    return seconds
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Measure cold-start import, warm-up and first-request time')
+    parser.add_argument('--no-warmup', action='store_true', help='Skip the warm-up before the first request')
+    args = parser.parse_args()
+
+    # Add current directory to path to import local modules
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+    # Running as a script makes this module __main__; the app records its
+    # timings in the imported 'startup' module
+    import startup
+    startup.WARMUP = not args.no_warmup
+
+    from app import app
+    from synthetic import synthetic_voice
+    import soundfile as sf
+
+    buffer = io.BytesIO()
+    sf.write(buffer, synthetic_voice(f0=140, duration=3.0), 22050, format='WAV')
+    buffer.seek(0)
+    response = app.test_client().post('/predict', data={'audio': (buffer, 'clip.wav')})
+
+    report = dict(startup.STARTUP_TIMINGS, status=response.status_code,
+                  numba_cache_dir=startup.NUMBA_CACHE_DIR)
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
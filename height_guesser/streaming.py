@@ -0,0 +1,285 @@
+import numpy as np
+
+import numpy_features
+from feature_extractor import N_FFT, HOP_LENGTH, feature_names, resolve_pitch_backend
+from pitch import estimate_f0
+
+# Frames analysed together per block of the stream. Memory use is bounded by
+# this window (plus fixed-size accumulators) whatever the clip length.
+WINDOW_FRAMES = 256
+
+# Documented agreement with extract_features (vad=False) on the same signal
+# (relative tolerance). Spectral, ZCR, RMS and yin F0 statistics are per-frame
+# and match up to float rounding. pyin F0 is decoded per window rather than over the
+# whole clip, and the MFCC/mel top_db floor is resolved from bounded
+# histograms, so those agree to within STREAM_RTOL.
+STREAM_RTOL = 1e-2
+
+# Resolution of the level histograms used to apply librosa's power_to_db
+# top_db clamp, which depends on the loudest value of the whole clip
+DB_MIN = -100.0
+DB_MAX = 100.0
+TOP_DB = 80.0
+MEL_BIN_DB = 0.01
+FRAME_BIN_DB = 0.1
+
+class RunningStats:
+    """
+    Running count, mean, variance, min and max (Welford/Chan update)
+
+    Values are added in batches along the first axis; each column of the
+    remaining axes keeps its own statistics.
+    """
+    def __init__(self, shape=()):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+        self.merge(n, batch_mean, batch_m2)
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+
+    def merge(self, n, mean, m2):
+        """Combine with the count, mean and M2 of another set of values"""
+        if n == 0:
+            return
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / self.count) if self.count else np.zeros_like(self.mean)
+
+class StreamingFeatureExtractor:
+    """
+    Block-wise feature extraction with bounded memory
+
+    Audio is pushed in blocks of any size. Whenever WINDOW_FRAMES analysis
+    frames are complete they are analysed together and folded into running
+    statistics, then the samples they no longer need are dropped. Framing
+    follows librosa's centered STFT (N_FFT samples every HOP_LENGTH, zero
+    padded by N_FFT // 2 at both ends), so every frame is the one the batch
+    extractor would see.
+    """
+    def __init__(self, sr, n_mfcc=13, n_mels=40, pitch_backend=None, pitch_range=None,
+                 window_frames=WINDOW_FRAMES):
+        self.sr = sr
+        self.n_mfcc = n_mfcc
+        self.n_mels = n_mels
+        self.pitch_backend = pitch_backend
+        self.pitch_range = pitch_range
+        self.window_frames = window_frames
+        self.n_samples = 0
+        self.finished = False
+
+        # NumPy implementations of librosa's transforms (see numpy_features.py),
+        # so streaming works without librosa and importing it stays cheap
+        self._window = numpy_features.hann(N_FFT)
+        self._mfcc_basis = numpy_features.mel_filters(sr, N_FFT)
+        self._mel_basis = numpy_features.mel_filters(sr, N_FFT, n_mels)
+        # Samples of the zero-padded signal not yet consumed by a frame
+        self._buffer = np.zeros(N_FFT // 2)
+
+        self._f0 = RunningStats()
+        self._frames = {name: RunningStats() for name in
+                        ('spectral_centroid', 'spectral_bandwidth', 'spectral_rolloff', 'zcr', 'rms')}
+        # Mel dB values: count, sum and sum of squares per level bin
+        n_bins = int((DB_MAX - DB_MIN) / MEL_BIN_DB) + 1
+        self._mel_hist = np.zeros((3, n_bins))
+        self._mel_max = -np.inf
+        # MFCC statistics bucketed by each frame's loudest mel band
+        self._mfcc_buckets = {}
+        self._mfcc_max = -np.inf
+
+    @property
+    def n_frames(self):
+        """Analysis frames folded into the statistics so far"""
+        return self._frames['zcr'].count
+
+    def update(self, block):
+        """Add a block of mono samples and analyse every completed window"""
+        if self.finished:
+            raise RuntimeError("Cannot add audio to a finished stream")
+        block = np.asarray(block, dtype=np.float64).ravel()
+        self.n_samples += len(block)
+        self._buffer = np.concatenate([self._buffer, block])
+        window_samples = (self.window_frames - 1) * HOP_LENGTH + N_FFT
+        while len(self._buffer) >= window_samples:
+            self._analyse(self._buffer[:window_samples])
+            self._buffer = self._buffer[self.window_frames * HOP_LENGTH:]
+
+    def finish(self):
+        """
+        Flush the remaining frames and return the final feature dict
+
+        Clips shorter than a second are zero-padded to one second, as in
+        ``extract_features``.
+        """
+        if not self.finished:
+            if self.n_samples < self.sr:
+                self._buffer = np.concatenate([self._buffer, np.zeros(self.sr - self.n_samples)])
+            self._buffer = np.concatenate([self._buffer, np.zeros(N_FFT // 2)])
+            if len(self._buffer) >= N_FFT:
+                n_frames = 1 + (len(self._buffer) - N_FFT) // HOP_LENGTH
+                self._analyse(self._buffer[:(n_frames - 1) * HOP_LENGTH + N_FFT])
+            self._buffer = np.zeros(0)
+            self.finished = True
+        return self.features()
+
+    def features(self):
+        """
+        Feature dict of the frames analysed so far
+
+        Before ``finish`` this is a provisional snapshot that excludes the
+        samples still waiting for a complete window.
+        """
+        features = {}
+        if self._f0.count:
+            features.update({'f0_mean': self._f0.mean, 'f0_std': self._f0.std,
+                             'f0_min': self._f0.min, 'f0_max': self._f0.max})
+        else:
+            features.update({'f0_mean': 0, 'f0_std': 0, 'f0_min': 0, 'f0_max': 0})
+
+        mfcc_mean, mfcc_std = self._mfcc_statistics()
+        for i in range(self.n_mfcc):
+            features[f'mfcc{i+1}_mean'] = mfcc_mean[i]
+            features[f'mfcc{i+1}_std'] = mfcc_std[i]
+
+        features['mel_mean'], features['mel_std'] = self._mel_statistics()
+
+        for name, stats in self._frames.items():
+            features[f'{name}_mean'] = stats.mean if stats.count else 0
+            features[f'{name}_std'] = stats.std if stats.count else 0
+
+        return {name: float(features[name]) for name in feature_names(self.n_mfcc)}
+
+    def _analyse(self, segment):
+        """Fold the frames of a zero-padded signal segment into the statistics"""
+        f0 = estimate_f0(segment, self.sr, backend=resolve_pitch_backend(pitch_backend=self.pitch_backend),
+                         pitch_range=self.pitch_range, center=False)
+        self._f0.update(f0[~np.isnan(f0)])
+
+        n_frames = 1 + (len(segment) - N_FFT) // HOP_LENGTH
+        frames = np.lib.stride_tricks.as_strided(
+            segment, shape=(n_frames, N_FFT),
+            strides=(segment.strides[0] * HOP_LENGTH, segment.strides[0]),
+            writeable=False)
+
+        # Zero crossing rate, with near-zero samples counted as positive
+        signs = np.where(np.abs(frames) <= 1e-10, 0, frames) >= 0
+        self._frames['zcr'].update(np.sum(signs[:, 1:] != signs[:, :-1], axis=1) / N_FFT)
+
+        S = np.abs(np.fft.rfft(frames * self._window, axis=1)).T
+        power = S ** 2
+
+        centroid = numpy_features.spectral_centroid(S, self.sr, n_fft=N_FFT)
+        self._frames['spectral_centroid'].update(centroid[0])
+        self._frames['spectral_bandwidth'].update(
+            numpy_features.spectral_bandwidth(S, self.sr, centroid, n_fft=N_FFT)[0])
+        self._frames['spectral_rolloff'].update(numpy_features.spectral_rolloff(S, self.sr, n_fft=N_FFT)[0])
+        self._frames['rms'].update(np.sqrt(np.mean(frames ** 2, axis=1)))
+
+        # Mel dB values go into a level histogram; the ref=np.max offset and
+        # top_db floor are applied once the loudest value is known
+        mel_db = 10 * np.log10(np.maximum(self._mel_basis @ power, 1e-10)).ravel()
+        self._mel_max = max(self._mel_max, mel_db.max())
+        bins = self._db_bins(mel_db, MEL_BIN_DB)
+        size = self._mel_hist.shape[1]
+        self._mel_hist[0] += np.bincount(bins, minlength=size)
+        self._mel_hist[1] += np.bincount(bins, weights=mel_db, minlength=size)
+        self._mel_hist[2] += np.bincount(bins, weights=mel_db ** 2, minlength=size)
+
+        # MFCCs use the floor known so far; frames are bucketed by their
+        # loudest band so those that end up entirely below the final floor
+        # can be replaced exactly in _mfcc_statistics
+        log_mel = 10 * np.log10(np.maximum(self._mfcc_basis @ power, 1e-10))
+        frame_max = log_mel.max(axis=0)
+        self._mfcc_max = max(self._mfcc_max, frame_max.max())
+        log_mel = np.maximum(log_mel, self._mfcc_max - TOP_DB)
+        mfcc = numpy_features.mfcc(log_mel, n_mfcc=self.n_mfcc).T
+        buckets = self._db_bins(frame_max, FRAME_BIN_DB)
+        for bucket in np.unique(buckets):
+            if bucket not in self._mfcc_buckets:
+                self._mfcc_buckets[bucket] = RunningStats(self.n_mfcc)
+            self._mfcc_buckets[bucket].update(mfcc[buckets == bucket])
+
+    @staticmethod
+    def _db_bins(values, width):
+        bins = np.round((np.clip(values, DB_MIN, DB_MAX) - DB_MIN) / width).astype(int)
+        return bins
+
+    def _mel_statistics(self):
+        count, total, squares = self._mel_hist
+        n = count.sum()
+        if n == 0:
+            return 0.0, 0.0
+        # power_to_db(ref=np.max): shift by the loudest value, floor at -top_db
+        levels = DB_MIN + np.arange(len(count)) * MEL_BIN_DB
+        clamped = levels < self._mel_max - TOP_DB
+        floor = -TOP_DB
+        total = total - self._mel_max * count
+        squares = squares - 2 * self._mel_max * self._mel_hist[1] + self._mel_max ** 2 * count
+        total = np.where(clamped, floor * count, total)
+        squares = np.where(clamped, floor ** 2 * count, squares)
+        mean = total.sum() / n
+        return mean, np.sqrt(max(squares.sum() / n - mean ** 2, 0.0))
+
+    def _mfcc_statistics(self):
+        stats = RunningStats(self.n_mfcc)
+        floor = self._mfcc_max - TOP_DB
+        n_bands = self._mfcc_basis.shape[0]
+        for bucket, bucket_stats in sorted(self._mfcc_buckets.items()):
+            level = DB_MIN + bucket * FRAME_BIN_DB
+            if level < floor:
+                # Every band of these frames is clamped to the floor, and the
+                # orthonormal DCT of a constant is nonzero only in MFCC 1
+                constant = np.zeros(self.n_mfcc)
+                constant[0] = floor * np.sqrt(n_bands)
+                stats.merge(bucket_stats.count, constant, np.zeros(self.n_mfcc))
+            else:
+                stats.merge(bucket_stats.count, bucket_stats.mean, bucket_stats.m2)
+        return stats.mean, stats.std
+
+def extract_features_stream(blocks, sr, n_mfcc=13, n_mels=40, pitch_backend=None, pitch_range=None,
+                            window_frames=WINDOW_FRAMES):
+    """
+    Extract audio features from an iterable of audio blocks
+
+    Produces the same dict as ``extract_features`` with ``vad=False``
+    (within STREAM_RTOL) while holding only one analysis window of audio in
+    memory, so clips of any length can be processed.
+
+    Parameters:
+    -----------
+    blocks : iterable of numpy.ndarray
+        Consecutive mono sample blocks of any size
+    sr : int
+        Sample rate of the audio
+    n_mfcc, n_mels, pitch_backend, pitch_range
+        As for ``extract_features``
+    window_frames : int
+        Frames analysed together per window
+
+    Returns:
+    --------
+    features : dict
+        Dictionary containing extracted features
+    """
+    extractor = StreamingFeatureExtractor(sr, n_mfcc=n_mfcc, n_mels=n_mels,
+                                          pitch_backend=pitch_backend, pitch_range=pitch_range,
+                                          window_frames=window_frames)
+    for block in blocks:
+        extractor.update(block)
+    return extractor.finish()
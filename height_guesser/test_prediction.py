@@ -2,7 +2,11 @@
 
 import os
 import sys
+import glob
+import json
+import time
 import argparse
+import contextlib
 import librosa
 import matplotlib.pyplot as plt
 import numpy as np
@@ -10,8 +14,14 @@ import numpy as np
 # Add current directory to path to import local modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from feature_extractor import extract_features
+from audio_io import ANALYSIS_PROFILES, DecodeError, apply_profile, decode_error
+from feature_extractor import extract_features, extract_features_from_audio, features_to_vector
+from pitch import PITCH_BACKENDS
+from vad import trim_silence
+from feature_cache import FeatureCache, FEATURE_CACHE_DIR
+from feature_store import FeatureStore
 from height_predictor import HeightPredictor
+import profiling
 
 def plot_audio_features(audio_path):
     """Plot various audio features for visualization"""
@@ -45,13 +55,266 @@ def plot_audio_features(audio_path):
     plt.tight_layout()
     plt.show()
 
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg', '.flac', '.m4a', '.webm')
+
+# Columns written per file in batch mode, followed by the feature dict
+RESULT_FIELDS = ['path', 'status', 'error', 'true_height', 'gender', 'height', 'lower_bound',
+                 'upper_bound', 'confidence', 'duration_seconds', 'analysed_fraction', 'load_seconds',
+                 'extract_seconds', 'predict_seconds', 'total_seconds']
+
+def collect_inputs(inputs):
+    """
+    Audio files named by paths, directories, glob patterns or manifests
+
+    A manifest is a .csv file with a 'path' column (and optional 'height'
+    and 'gender' columns) or a .txt file with one path per line; relative
+    paths are resolved against the manifest's directory. Returns a list of
+    (path, true_height, gender) tuples with duplicates removed.
+    """
+    import csv
+    items = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for root, _, files in os.walk(entry):
+                items += [(os.path.join(root, name), None, None) for name in sorted(files)
+                          if name.lower().endswith(AUDIO_EXTENSIONS)]
+        elif entry.lower().endswith(('.csv', '.txt')) and os.path.isfile(entry):
+            base = os.path.dirname(entry)
+            with open(entry, newline='') as f:
+                if entry.lower().endswith('.csv'):
+                    rows = [(row['path'], row.get('height') or None, row.get('gender') or None)
+                            for row in csv.DictReader(f)]
+                else:
+                    rows = [(line.strip(), None, None) for line in f if line.strip()]
+            items += [(os.path.join(base, path), float(height) if height else None, gender)
+                      for path, height, gender in rows]
+        elif glob.has_magic(entry):
+            items += [(path, None, None) for path in sorted(glob.glob(entry, recursive=True))]
+        else:
+            items.append((entry, None, None))
+    unique = {}
+    for item in items:
+        unique.setdefault(os.path.normpath(item[0]), item)
+    return [(path,) + item[1:] for path, item in unique.items()]
+
+def completed_paths(output):
+    """
+    Paths already scored successfully in a CSV or JSONL results file
+
+    Files recorded with status 'error' are left out, so a resumed run
+    retries them (the newest row of a path is its current result).
+    """
+    import csv
+    if not os.path.exists(output):
+        return set()
+    with open(output, newline='') as f:
+        if output.endswith('.csv'):
+            # A row cut short by an interrupted run has missing (None) fields
+            return {os.path.normpath(row['path']) for row in csv.DictReader(f)
+                    if None not in row.values() and row['status'] != 'error'}
+        paths = set()
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record['status'] != 'error':
+                    paths.add(os.path.normpath(record['path']))
+            except (ValueError, KeyError):
+                # A line cut short by an interrupted run is processed again
+                pass
+        return paths
+
+# Extraction options and predictor of a batch worker process
+_worker = {}
+
+def _init_worker(options):
+    from feature_extractor import _init_batch_worker
+    _init_batch_worker(options)
+    _worker['options'] = options
+    _worker['predictor'] = HeightPredictor()
+
+def _score_file(item):
+    """Features, prediction and timings of one file (runs in a worker)"""
+    path, true_height, gender = item
+    options = dict(_worker['options'])
+    analysis_profile = options.pop('analysis_profile', None)
+    record = {'path': path, 'true_height': true_height}
+    start = time.perf_counter()
+    try:
+        try:
+            y, sr = librosa.load(path, sr=None)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            raise decode_error(os.path.splitext(path)[1], name=path) from e
+        record['duration_seconds'] = len(y) / sr
+        y, sr, _ = apply_profile(y, sr, analysis_profile)
+        y, speech = trim_silence(y, sr)
+        record['analysed_fraction'] = speech['analysed_fraction']
+        loaded = time.perf_counter()
+        features = extract_features_from_audio(y, sr, **options)
+        extracted = time.perf_counter()
+        prediction = _worker['predictor'].predict_batch(
+            [features_to_vector(features)], [gender])
+        predicted = time.perf_counter()
+    except Exception as e:
+        if isinstance(e, DecodeError):
+            error = str(e)
+        else:
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        record.update(status='error', error=error, total_seconds=time.perf_counter() - start)
+        return record
+    record.update({
+        'status': 'ok',
+        'gender': str(prediction['gender'][0]),
+        'height': float(prediction['height'][0]),
+        'lower_bound': float(prediction['lower_bound'][0]),
+        'upper_bound': float(prediction['upper_bound'][0]),
+        'confidence': float(prediction['confidence'][0]),
+        'load_seconds': loaded - start,
+        'extract_seconds': extracted - loaded,
+        'predict_seconds': predicted - extracted,
+        'total_seconds': predicted - start,
+    })
+    record.update({name: float(value) for name, value in features.items()})
+    return record
+
+def run_batch(args):
+    """Score many files in parallel, appending one result per file to the output"""
+    import csv
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    from feature_extractor import feature_names
+
+    items = collect_inputs(args.inputs)
+    output = args.output or 'predictions.jsonl'
+    done = completed_paths(output)
+    pending = [(path, height, gender or args.gender) for path, height, gender in items
+               if os.path.normpath(path) not in done]
+    print(f"{len(items)} files, {len(items) - len(pending)} already in {output}, {len(pending)} to process")
+    if not pending:
+        return 0
+
+    options = {'pitch_backend': args.pitch_backend, 'analysis_profile': args.analysis_profile}
+    workers = min(args.workers or os.cpu_count() or 1, len(pending))
+    fields = RESULT_FIELDS + feature_names()
+    is_csv = output.endswith('.csv')
+    new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+    processed = failed = 0
+    audio_seconds = 0.0
+    errors = []
+    store = FeatureStore(args.store) if args.store else None
+    stored = []
+    
+    def flush_store():
+        # Appended in batches: each append commits the store's row counts.
+        # Records are passed as dicts so the store picks its own column order
+        if stored:
+            store.append(stored, [r['path'] for r in stored],
+                         durations=[r['duration_seconds'] for r in stored],
+                         labels=[{'height': r['true_height']} if r['true_height'] is not None else {}
+                                 for r in stored])
+            stored.clear()
+    
+    start = time.perf_counter()
+    with open(output, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore') if is_csv else None
+        if writer and new_file:
+            writer.writeheader()
+        elif not new_file:
+            # Start on a fresh line after a record cut short by an interruption
+            with open(output, 'rb') as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b'\n':
+                    f.write('\n')
+
+        def write(record):
+            nonlocal processed, failed, audio_seconds
+            if writer:
+                writer.writerow(record)
+            else:
+                f.write(json.dumps(record) + '\n')
+            # Flushed per file so an interrupted run can resume
+            f.flush()
+            processed += 1
+            audio_seconds += record.get('duration_seconds', 0)
+            if record['status'] != 'ok':
+                failed += 1
+                print(f"  {record['path']}: {record['error']}")
+            else:
+                if record['true_height'] is not None:
+                    errors.append(record['height'] - record['true_height'])
+                if store is not None:
+                    stored.append(record)
+                    if len(stored) >= 256:
+                        flush_store()
+            if processed % 100 == 0:
+                print(f"  {processed}/{len(pending)} files")
+
+        if workers == 1:
+            _init_worker(options)
+            for item in pending:
+                write(_score_file(item))
+        else:
+            # At most a few files in flight per worker, so memory does not
+            # grow with the size of the dataset
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(options,)) as executor:
+                queue = iter(pending)
+                futures = set()
+                while True:
+                    for item in queue:
+                        futures.add(executor.submit(_score_file, item))
+                        if len(futures) >= workers * 4:
+                            break
+                    if not futures:
+                        break
+                    finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        write(future.result())
+        flush_store()
+
+    elapsed = time.perf_counter() - start
+    print("\n===== Batch Summary =====")
+    print(f"Files: {processed} processed, {failed} failed, {workers} worker(s)")
+    print(f"Wall time: {elapsed:.1f} s")
+    print(f"Throughput: {processed / elapsed:.2f} files/s, {audio_seconds / elapsed:.1f} audio-seconds/s")
+    if errors:
+        errors = np.array(errors)
+        print(f"Against {len(errors)} labelled heights: MAE {np.mean(np.abs(errors)):.1f} cm, "
+              f"bias {np.mean(errors):+.1f} cm")
+    print(f"Results: {output}")
+    if store is not None:
+        print(f"Feature store: {args.store} ({len(store)} clips)")
+    print("=========================\n")
+    return 1 if failed == processed else 0
+
 def main():
     parser = argparse.ArgumentParser(description='Test height prediction from voice')
-    parser.add_argument('audio_file', help='Path to audio file to analyze')
+    parser.add_argument('inputs', nargs='+',
+                        help='Audio file to analyze; several files, directories, glob patterns or a '
+                             'manifest (.csv with path[,height,gender] columns, or .txt) run batch mode')
     parser.add_argument('--gender', choices=['male', 'female'], help='Specify gender (optional)')
     parser.add_argument('--plot', action='store_true', help='Plot audio features')
+    parser.add_argument('--cache-dir', default=FEATURE_CACHE_DIR,
+                        help='Directory of the on-disk feature cache (defaults to FEATURE_CACHE_DIR)')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='Profile the prediction (cache bypassed) and write the pstats, collapsed-stack and summary files to DIR')
+    parser.add_argument('--output', help='Batch mode results file, .csv or .jsonl (default: predictions.jsonl); '
+                                         'files already in it are skipped')
+    parser.add_argument('--workers', type=int, help='Batch mode worker processes (default: all CPUs)')
+    parser.add_argument('--store', metavar='DIR',
+                        help='Also append the feature vectors of scored files to this feature store')
+    parser.add_argument('--pitch-backend', choices=PITCH_BACKENDS, help='Pitch backend in batch mode')
+    parser.add_argument('--analysis-profile', choices=list(ANALYSIS_PROFILES),
+                        help='Analysis profile in batch mode')
     args = parser.parse_args()
     
+    first = args.inputs[0]
+    batch = (args.output or len(args.inputs) > 1 or os.path.isdir(first) or glob.has_magic(first)
+             or first.lower().endswith(('.csv', '.txt')))
+    if batch:
+        return run_batch(args)
+    args.audio_file = args.inputs[0]
+    
     # Check if file exists
     if not os.path.exists(args.audio_file):
         print(f"Error: File '{args.audio_file}' not found.")
@@ -59,14 +322,23 @@ def main():
     
     # Extract features
     print(f"Extracting features from '{args.audio_file}'...")
-    features = extract_features(args.audio_file)
-    
-    # Initialize predictor
-    predictor = HeightPredictor()
-    
-    # Make prediction
-    height, lower, upper = predictor.predict_with_range(features, args.gender)
-    _, confidence = predictor.predict(features, args.gender)
+    profile = profiling.RequestProfile(directory=args.profile) if args.profile else contextlib.nullcontext()
+    with profile:
+        if args.profile:
+            with profiling.allocations('extract'):
+                features = extract_features(args.audio_file)
+        else:
+            cache = FeatureCache(directory=args.cache_dir)
+            features = extract_features(args.audio_file, cache=cache)
+            if cache.disk_hits:
+                print("Features loaded from cache")
+        
+        # Initialize predictor
+        predictor = HeightPredictor()
+        
+        # Make prediction
+        height, lower, upper = predictor.predict_with_range(features, args.gender)
+        _, confidence = predictor.predict(features, args.gender)
     
     # Determine detected gender
     detected_gender = "male" if features['f0_mean'] < 160 else "female"
@@ -84,6 +356,17 @@ def main():
     print(f"Confidence: {confidence*100:.1f}%")
     print("===================================\n")
     
+    if args.profile:
+        summary = profile.summary()
+        print(f"Profile ({summary['seconds']:.2f} s, {summary['samples']} stack samples):")
+        for function in summary['top_functions'][:10]:
+            print(f"  {function['cumulative_seconds']:>8.3f} s  {function['function']}")
+        extract = summary['allocations']['extract']
+        print(f"Extraction peak traced memory: {extract['peak_bytes'] / 2**20:.1f} MiB")
+        for kind, path in summary['files'].items():
+            print(f"  {kind}: {path}")
+        print()
+    
     # Plot features if requested
     if args.plot:
         try:
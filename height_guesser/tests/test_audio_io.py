@@ -0,0 +1,32 @@
+import sys
+
+import numpy as np
+import pytest
+
+import feature_extractor
+import numpy_features
+from audio_io import apply_profile
+from synthetic import synthetic_voice
+
+SR = 48000
+
+@pytest.fixture
+def without_librosa(monkeypatch):
+    """Make librosa unimportable, as in a deployment without it"""
+    monkeypatch.setitem(sys.modules, 'librosa', None)
+    monkeypatch.setattr(feature_extractor, 'librosa', None)
+
+@pytest.mark.parametrize('backend', ['numpy', 'auto'])
+def test_numpy_backend_resamples_without_librosa(without_librosa, backend):
+    y = synthetic_voice(f0=150, duration=2.0, sr=SR)
+    resampled, sr, info = apply_profile(y, SR, 'speech', feature_backend=backend)
+    assert sr == 16000
+    assert len(resampled) == len(y) // 3
+    np.testing.assert_allclose(resampled, numpy_features.resample(y, SR, 16000))
+    assert info['sr'] == 16000
+
+def test_numpy_backend_does_not_use_librosa(monkeypatch):
+    y = synthetic_voice(f0=150, duration=1.0, sr=SR)
+    monkeypatch.setattr(feature_extractor, 'load_librosa', lambda: pytest.fail("librosa was loaded"))
+    _, sr, _ = apply_profile(y, SR, 'fast', feature_backend='numpy')
+    assert sr == 16000
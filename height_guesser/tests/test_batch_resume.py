@@ -0,0 +1,27 @@
+import csv
+import json
+
+import pytest
+
+pytest.importorskip('matplotlib')
+
+from test_prediction import RESULT_FIELDS, completed_paths
+
+RECORDS = [
+    {'path': 'a.wav', 'status': 'ok', 'height': 170.0},
+    {'path': 'b.wav', 'status': 'error', 'error': 'Could not decode b.wav: it is empty, corrupt or not wav audio'},
+]
+
+def test_failed_files_are_retried_jsonl(tmp_path):
+    output = tmp_path / 'results.jsonl'
+    # The last line was cut short by an interrupted run
+    output.write_text(''.join(json.dumps(r) + '\n' for r in RECORDS) + '{"path": "c.wav", "sta')
+    assert completed_paths(str(output)) == {'a.wav'}
+
+def test_failed_files_are_retried_csv(tmp_path):
+    output = tmp_path / 'results.csv'
+    with open(output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, restval='')
+        writer.writeheader()
+        writer.writerows(RECORDS)
+    assert completed_paths(str(output)) == {'a.wav'}
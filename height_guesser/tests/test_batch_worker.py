@@ -0,0 +1,13 @@
+import feature_extractor
+
+def test_warm_up_gets_only_in_memory_options(monkeypatch):
+    calls = []
+    monkeypatch.setattr(feature_extractor, 'extract_features_from_audio',
+                        lambda y, sr, **options: calls.append(options))
+    monkeypatch.setattr(feature_extractor, '_batch_options', {})
+    options = {'pitch_backend': 'yin', 'analysis_profile': 'speech', 'vad': False}
+    feature_extractor._init_batch_worker(options)
+    # The warm-up ran, without the file-only options
+    assert calls == [{'pitch_backend': 'yin'}]
+    # Files still get every option
+    assert feature_extractor._batch_options == options
@@ -0,0 +1,43 @@
+import threading
+
+import numpy as np
+
+import extraction_service
+from feature_extractor import extract_features_from_audio
+from synthetic import synthetic_voice
+
+# Two sample rates, so the YIN pass runs once per rate group
+CLIPS = [(110, 22050), (210, 16000), (150, 22050), (180, 16000), (130, 22050), (240, 16000)]
+
+def test_inprocess_batch_with_mixed_sample_rates(monkeypatch):
+    # The batched YIN path only runs with the yin backend and full range
+    monkeypatch.setattr(extraction_service, 'PITCH_BACKEND', 'yin')
+    monkeypatch.setattr(extraction_service, 'PITCH_RANGE', 'full')
+    monkeypatch.setattr('pitch.PITCH_BACKEND', 'yin')
+    batcher = extraction_service.connect('inprocess', batch_size=len(CLIPS), wait=1.0)
+
+    clips = [(synthetic_voice(f0=f0, duration=1.0, sr=sr, seed=i), sr) for i, (f0, sr) in enumerate(CLIPS)]
+    results = [None] * len(clips)
+    barrier = threading.Barrier(len(clips))
+
+    def submit(i):
+        barrier.wait()
+        results[i] = batcher.predict(*clips[i], timeout=60)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(clips))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = batcher.stats()
+    assert stats['clips'] == len(clips)
+    assert stats['failed'] == 0
+    assert stats['mean_batch_size'] == round(len(clips) / stats['batches'], 2)
+    # Batched results are those of extracting each clip on its own
+    for (y, sr), (features, prediction) in zip(clips, results):
+        expected = extract_features_from_audio(y, sr, keys=batcher.predictor.required_features,
+                                               pitch_backend='yin')
+        for name, value in expected.items():
+            assert np.isclose(features[name], value)
+        assert len(prediction['height']) == 1
@@ -0,0 +1,31 @@
+from feature_cache import FeatureCache
+from synthetic import synthetic_voice
+
+SR = 22050
+
+def test_repeated_audio_is_served_from_the_cache(tmp_path):
+    y = synthetic_voice(duration=1.0, sr=SR)
+    cache = FeatureCache(max_entries=4, directory=str(tmp_path))
+    first = cache.extract(y, SR, keys=['f0_mean'], pitch_backend='yin')
+    second = cache.extract(y.copy(), SR, keys=['f0_mean'], pitch_backend='yin')
+    assert second == first
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+    # Another process's memory tier is empty, but the disk tier is shared
+    other = FeatureCache(max_entries=4, directory=str(tmp_path))
+    assert other.extract(y, SR, keys=['f0_mean'], pitch_backend='yin') == first
+    assert other.stats()['disk_hits'] == 1
+
+def test_parameters_are_part_of_the_key():
+    y = synthetic_voice(duration=1.0, sr=SR)
+    assert FeatureCache.key(y, SR, pitch_backend='yin') != FeatureCache.key(y, SR, pitch_backend='pyin')
+    assert FeatureCache.key(y, SR, feature_backend='numpy') != FeatureCache.key(y, SR, feature_backend='librosa')
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = FeatureCache(max_entries=2, directory=None)
+    for i in range(3):
+        cache.put(f'key{i}', {'f0_mean': float(i)})
+    assert cache.get('key0') is None
+    assert cache.get('key2') == {'f0_mean': 2.0}
+    assert cache.stats()['evictions'] == 1
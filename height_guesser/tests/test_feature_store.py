@@ -0,0 +1,43 @@
+import numpy as np
+
+from feature_extractor import VECTOR_FEATURES, feature_names
+from feature_store import FeatureStore
+
+def _record(seed):
+    # Distinct value per feature so a column mix-up cannot go unnoticed
+    rng = np.random.default_rng(seed)
+    return {name: float(value) for name, value in zip(feature_names(), rng.uniform(-500, 5000, len(feature_names())))}
+
+def test_feature_names_and_store_columns_differ_in_order():
+    # The store's schema is not feature_names() order, so rows must be mapped by name
+    assert sorted(feature_names()) == sorted(VECTOR_FEATURES)
+    assert list(feature_names()) != list(VECTOR_FEATURES)
+
+def test_round_trip_by_column_name(tmp_path):
+    records = [_record(i) for i in range(3)]
+    store = FeatureStore(str(tmp_path / 'store'))
+    rows = store.append(records, [f'clip{i}.wav' for i in range(3)], hashes=['a', 'b', 'c'],
+                        durations=[1.0, 2.0, 3.0], labels=[{'height': 170.0}, {}, {}])
+    assert rows == [0, 1, 2]
+
+    reopened = FeatureStore(str(tmp_path / 'store'))
+    matrix = reopened.read()
+    for row, record in enumerate(records):
+        for name in reopened.columns:
+            np.testing.assert_allclose(matrix[row, reopened.columns.index(name)], record[name], rtol=1e-6)
+    np.testing.assert_allclose(reopened.column('spectral_centroid_mean'),
+                               [r['spectral_centroid_mean'] for r in records], rtol=1e-6)
+
+def test_batch_records_are_stored_by_name(tmp_path):
+    # Records as written by test_prediction.py --store: features plus result fields
+    records = [dict(_record(i), path=f'clip{i}.wav', status='ok', height=170.0) for i in range(2)]
+    store = FeatureStore(str(tmp_path / 'store'))
+    store.append(records, [r['path'] for r in records], hashes=['a', 'b'])
+    for name in ('spectral_centroid_mean', 'mfcc1_mean', 'rms_std', 'f0_mean'):
+        np.testing.assert_allclose(store.column(name), [r[name] for r in records], rtol=1e-6)
+
+def test_skip_existing_hashes(tmp_path):
+    store = FeatureStore(str(tmp_path / 'store'))
+    store.append([_record(0)], ['a.wav'], hashes=['h'])
+    assert store.append([_record(1)], ['b.wav'], hashes=['h']) == []
+    assert len(store) == 1
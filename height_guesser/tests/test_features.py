@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip('librosa')
+
+from feature_extractor import SPECTRAL_RTOL, extract_features_from_audio, feature_names
+from synthetic import synthetic_voice
+
+# Voice, sample rate and duration of each test clip
+CLIPS = [(120.0, 22050, 2.0), (210.0, 16000, 3.0), (165.0, 44100, 1.5)]
+
+def per_feature_reference(y, sr, n_mfcc=13, n_mels=40):
+    """Statistics from one librosa call per feature, as before the shared STFT"""
+    features = {}
+    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc)
+    for i in range(n_mfcc):
+        features[f'mfcc{i+1}_mean'] = np.mean(mfccs[i])
+        features[f'mfcc{i+1}_std'] = np.std(mfccs[i])
+    mel_spec_db = librosa.power_to_db(librosa.feature.melspectrogram(y=y, sr=sr, n_mels=n_mels), ref=np.max)
+    features['mel_mean'] = np.mean(mel_spec_db)
+    features['mel_std'] = np.std(mel_spec_db)
+    frames = {
+        'spectral_centroid': librosa.feature.spectral_centroid(y=y, sr=sr)[0],
+        'spectral_bandwidth': librosa.feature.spectral_bandwidth(y=y, sr=sr)[0],
+        'spectral_rolloff': librosa.feature.spectral_rolloff(y=y, sr=sr)[0],
+        'zcr': librosa.feature.zero_crossing_rate(y)[0],
+        'rms': librosa.feature.rms(y=y)[0],
+    }
+    for name, values in frames.items():
+        features[f'{name}_mean'] = np.mean(values)
+        features[f'{name}_std'] = np.std(values)
+    return features
+
+def assert_features_close(actual, expected, rtol, atol=1e-6):
+    mismatched = {name: (actual[name], value) for name, value in expected.items()
+                  if not np.isclose(actual[name], value, rtol=rtol, atol=atol)}
+    assert not mismatched, mismatched
+
+@pytest.fixture(params=CLIPS, ids=lambda clip: f'{clip[0]:g}Hz-{clip[1]}')
+def clip(request):
+    f0, sr, duration = request.param
+    return synthetic_voice(f0=f0, duration=duration, sr=sr), sr
+
+def test_shared_stft_matches_per_feature_extraction(clip):
+    y, sr = clip
+    features = extract_features_from_audio(y, sr, pitch_backend='yin', feature_backend='librosa')
+    assert set(features) == set(feature_names())
+    assert_features_close(features, per_feature_reference(y, sr), SPECTRAL_RTOL)
+
+def test_numpy_backend_matches_librosa(clip):
+    from numpy_features import NUMPY_RTOL
+    y, sr = clip
+    expected = extract_features_from_audio(y, sr, pitch_backend='yin', feature_backend='librosa')
+    actual = extract_features_from_audio(y, sr, pitch_backend='yin', feature_backend='numpy')
+    assert_features_close(actual, expected, NUMPY_RTOL, atol=1e-3)
+
+def test_keys_subset_matches_full_extraction(clip):
+    y, sr = clip
+    full = extract_features_from_audio(y, sr, pitch_backend='yin')
+    keys = ['f0_mean', 'rms_std', 'mfcc3_mean', 'spectral_bandwidth_std']
+    subset = extract_features_from_audio(y, sr, pitch_backend='yin', keys=keys)
+    # Every statistic of the requested nodes, none of the others
+    assert set(keys) <= set(subset) < set(full)
+    assert 'spectral_centroid_mean' not in subset
+    assert_features_close(subset, {name: full[name] for name in subset}, 1e-12)
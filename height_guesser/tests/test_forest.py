@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from forest import TreeEnsemble
+
+RandomForestRegressor = pytest.importorskip('sklearn.ensemble').RandomForestRegressor
+
+@pytest.fixture
+def fitted():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 5))
+    heights = 170 + 8 * X[:, 0] - 4 * X[:, 2] + rng.normal(scale=2, size=len(X))
+    model = RandomForestRegressor(n_estimators=12, max_depth=6, random_state=0).fit(X, heights)
+    return model, rng.normal(size=(50, 5))
+
+def test_exported_forest_matches_sklearn_trees(fitted, tmp_path):
+    model, X = fitted
+    path = str(tmp_path / 'forest')
+    TreeEnsemble.from_sklearn(model, feature_names=list('abcde')).save(path)
+    ensemble = TreeEnsemble.load(path)
+    assert isinstance(ensemble.ints, np.memmap)
+    assert ensemble.feature_names == list('abcde')
+
+    expected = np.column_stack([tree.predict(X) for tree in model.estimators_])
+    np.testing.assert_allclose(ensemble.predict_trees(X), expected)
+    np.testing.assert_allclose(ensemble.predict(X), model.predict(X))
+    np.testing.assert_allclose(ensemble.predict_trees(X[0]), expected[:1])
+
+def test_interval_contains_mean(fitted):
+    model, X = fitted
+    mean, lower, upper = TreeEnsemble.from_sklearn(model).predict_interval(X, coverage=0.9)
+    np.testing.assert_allclose(mean, model.predict(X))
+    assert np.all(lower <= mean) and np.all(mean <= upper)
+    assert np.all(lower < upper)
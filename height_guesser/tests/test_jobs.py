@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue, QueueFull
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+def double(x):
+    if x < 0:
+        raise ValueError("negative input")
+    return {'value': 2 * x}
+
+def test_submit_runs_job_to_completion():
+    queue = JobQueue(double, workers=2)
+    done = queue.get(queue.submit(21), wait=5)
+    assert done['status'] == 'done'
+    assert done['result'] == {'value': 42}
+    assert done['queue_seconds'] >= 0 and done['run_seconds'] >= 0
+
+    failed = queue.get(queue.submit(-1), wait=5)
+    assert failed['status'] == 'failed'
+    assert failed['error'] == "negative input"
+    assert queue.stats()['completed'] == 1 and queue.stats()['failed'] == 1
+
+def test_full_queue_rejects_jobs():
+    release = threading.Event()
+    queue = JobQueue(lambda x: release.wait(5), workers=1, max_queue=1)
+    running = queue.submit(1)
+    wait_for(lambda: queue.get(running)['status'] == 'running')
+    queued = queue.submit(2)
+    with pytest.raises(QueueFull):
+        queue.submit(3)
+    assert queue.stats()['queued'] == 1
+
+    release.set()
+    assert queue.get(queued, wait=5)['status'] == 'done'
+    queue.get(queue.submit(4), wait=5)
+    assert queue.stats()['completed'] == 3
+
+def test_finished_jobs_expire_after_ttl(tmp_path):
+    queue = JobQueue(double, ttl=0.1, directory=str(tmp_path))
+    job_id = queue.submit(1)
+    assert queue.get(job_id, wait=5)['status'] == 'done'
+    assert os.path.exists(tmp_path / f'{job_id}.json')
+    time.sleep(0.2)
+    assert queue.get(job_id) is None
+    assert queue.stats()['expired'] == 1
+    assert not os.path.exists(tmp_path / f'{job_id}.json')
+
+def test_job_store_dir_is_shared_between_queues(tmp_path):
+    release = threading.Event()
+    submitter = JobQueue(lambda x: release.wait(5) and double(x), directory=str(tmp_path))
+    reader = JobQueue(double, directory=str(tmp_path))
+    job_id = submitter.submit(5)
+    wait_for(lambda: reader.get(job_id) is not None and reader.get(job_id)['status'] == 'running')
+
+    release.set()
+    job = reader.get(job_id, wait=5)
+    assert job['status'] == 'done'
+    assert job['result'] == {'value': 10}
+    assert reader.get('not-a-job-id') is None
+    assert reader.get('0' * 32) is None
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from feature_extractor import HOP_LENGTH, N_FFT, extract_features_from_audio
+from streaming import STREAM_RTOL, StreamingFeatureExtractor, extract_features_stream
+from synthetic import synthetic_voice
+
+SR = 22050
+
+def blocks(y, size):
+    return [y[i:i + size] for i in range(0, len(y), size)]
+
+@pytest.mark.parametrize('block_size', [1000, 4096, 48000])
+@pytest.mark.parametrize('window_frames', [8, 256])
+def test_stream_matches_batch_extraction(block_size, window_frames):
+    y = synthetic_voice(f0=150, duration=3.0, sr=SR)
+    expected = extract_features_from_audio(y, SR, pitch_backend='yin')
+    actual = extract_features_stream(blocks(y, block_size), SR, pitch_backend='yin',
+                                     window_frames=window_frames)
+    assert set(actual) == set(expected)
+    mismatched = {name: (actual[name], value) for name, value in expected.items()
+                  if not np.isclose(actual[name], value, rtol=STREAM_RTOL, atol=1e-6)}
+    assert not mismatched, mismatched
+
+def test_short_clip_is_padded_like_batch_extraction():
+    y = synthetic_voice(f0=200, duration=0.4, sr=SR)
+    expected = extract_features_from_audio(y, SR, pitch_backend='yin')
+    actual = extract_features_stream(blocks(y, 2000), SR, pitch_backend='yin')
+    np.testing.assert_allclose([actual[k] for k in expected], list(expected.values()),
+                               rtol=STREAM_RTOL, atol=1e-6)
+
+def test_memory_is_bounded_by_the_window():
+    extractor = StreamingFeatureExtractor(SR, pitch_backend='yin', window_frames=16)
+    limit = (16 - 1) * HOP_LENGTH + N_FFT + 4096
+    for block in blocks(synthetic_voice(duration=10.0, sr=SR), 4096):
+        extractor.update(block)
+        assert len(extractor._buffer) <= limit
+    assert extractor.n_frames > 0
+    extractor.finish()
+    with pytest.raises(RuntimeError):
+        extractor.update(np.zeros(10))
@@ -0,0 +1,111 @@
+import os
+import numpy as np
+
+from pitch import frame_signal
+
+# Drop silence before analysis (VAD=0 analyses the whole signal)
+VAD_ENABLED = os.environ.get('VAD', '1').lower() in ('1', 'true', 'yes')
+
+# Analysis frames of the detector
+FRAME_SECONDS = 0.025
+HOP_SECONDS = 0.010
+
+# A frame is speech when its energy is ENERGY_MARGIN_DB above the noise floor
+# (the 10th percentile of frame energies) and within DYNAMIC_RANGE_DB of the
+# loudest frame. Frames with a zero crossing rate above ZCR_MAX (hiss,
+# broadband noise) must clear the threshold by another ENERGY_MARGIN_DB.
+ENERGY_MARGIN_DB = 12.0
+DYNAMIC_RANGE_DB = 50.0
+ZCR_MAX = 0.25
+
+# Region smoothing: gaps shorter than MIN_GAP_SECONDS are bridged, regions
+# shorter than MIN_REGION_SECONDS are dropped, and HANGOVER_SECONDS are kept
+# on both sides of each region so onsets and decays are not clipped
+MIN_GAP_SECONDS = 0.3
+MIN_REGION_SECONDS = 0.1
+HANGOVER_SECONDS = 0.1
+
+def speech_regions(y, sr):
+    """
+    Sample ranges of a signal that contain speech
+
+    Returns a list of (start, end) sample indices. A signal without enough
+    contrast between its quiet and loud parts to tell speech from
+    background is returned as one region covering everything.
+    """
+    frame_length = max(int(FRAME_SECONDS * sr), 1)
+    hop_length = max(int(HOP_SECONDS * sr), 1)
+    if len(y) < frame_length:
+        return [(0, len(y))]
+    frames = frame_signal(y, frame_length, hop_length, center=False)
+
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+    floor = np.percentile(energy_db, 10)
+    loudest = energy_db.max()
+    if loudest - floor < ENERGY_MARGIN_DB:
+        return [(0, len(y))]
+    threshold = max(floor + ENERGY_MARGIN_DB, loudest - DYNAMIC_RANGE_DB)
+    signs = frames >= 0
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    active = (energy_db > threshold) & ((zcr < ZCR_MAX) | (energy_db > threshold + ENERGY_MARGIN_DB))
+
+    edges = np.diff(np.concatenate([[0], active.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Bridge short gaps between frame runs, then drop short runs
+    runs = []
+    for start, end in zip(starts, ends):
+        if runs and (start - runs[-1][1]) * HOP_SECONDS < MIN_GAP_SECONDS:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end])
+    runs = [run for run in runs if (run[1] - run[0]) * HOP_SECONDS >= MIN_REGION_SECONDS]
+    if not runs:
+        return [(0, len(y))]
+
+    # Frame runs to sample ranges with hangover, merging any that overlap
+    hangover = int(HANGOVER_SECONDS * sr)
+    regions = []
+    for start, end in runs:
+        lo = max(start * hop_length - hangover, 0)
+        hi = min((end - 1) * hop_length + frame_length + hangover, len(y))
+        if regions and lo <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], int(hi))
+        else:
+            regions.append((int(lo), int(hi)))
+    return regions
+
+def trim_silence(y, sr, enabled=None):
+    """
+    Keep only the speech regions of a signal
+
+    Parameters:
+    -----------
+    y : numpy.ndarray
+        Audio signal
+    sr : int
+        Sample rate of ``y``
+    enabled : bool, optional
+        Run the detector; defaults to VAD_ENABLED
+
+    Returns:
+    --------
+    y : numpy.ndarray
+        The speech regions, concatenated
+    info : dict
+        'vad' (whether it ran), 'speech_regions', 'speech_duration' and
+        'analysed_fraction' (share of the input that is analysed)
+    """
+    enabled = VAD_ENABLED if enabled is None else enabled
+    n_samples = len(y)
+    regions = speech_regions(y, sr) if enabled and n_samples else [(0, n_samples)]
+    if regions != [(0, n_samples)]:
+        y = np.concatenate([y[start:end] for start, end in regions])
+    info = {
+        'vad': enabled,
+        'speech_regions': len(regions),
+        'speech_duration': round(len(y) / sr, 3),
+        'analysed_fraction': round(len(y) / n_samples, 3) if n_samples else 1.0,
+    }
+    return y, info